@@ -0,0 +1,77 @@
+"""
+Micro-benchmarks of the per-request CPU cost of the client hot path.
+
+Each case compares the previous way of building a request (f-string URL, `json=` body, eager f-string log message)
+with the current one (cached URL, pre-encoded body, lazy and sampled logging). Run from the repository root:
+
+    python -m benchmarks.bench_request_path
+"""
+import asyncio
+import logging
+import sys
+import timeit
+from typing import Callable, List, Tuple
+
+import httpx
+
+from saga_client.client import JSON_HEADERS, SagaClient
+
+HOST = 'http://127.0.0.1:8000'
+GROUP_ID = 'example_group'
+
+logger = logging.getLogger('bench_request_path')
+logger.setLevel(logging.WARNING)
+
+
+def build_request_before() -> httpx.Request:
+    url = f'{HOST}/v1/group/'
+    return httpx.Request('POST', url, json={'groupId': GROUP_ID})
+
+
+def build_request_after(client: SagaClient) -> httpx.Request:
+    url = client._collection_url(HOST)
+    return httpx.Request('POST', url, content=client.json_encoder({'groupId': GROUP_ID}), headers=JSON_HEADERS)
+
+
+def log_before() -> None:
+    logger.info(f'Group {GROUP_ID} created on {HOST}')
+
+
+def log_after(client: SagaClient) -> None:
+    if logger.isEnabledFor(logging.INFO) and client._log_sampled(HOST):
+        logger.info('Group %s created on %s', GROUP_ID, HOST)
+
+
+def create_on_host(client: SagaClient, http: httpx.AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+    loop.run_until_complete(client.create_group_on_host(http, HOST, GROUP_ID))
+
+
+def measure(cases: List[Tuple[str, Callable[[], object]]], number: int) -> None:
+    for name, case in cases:
+        seconds = min(timeit.repeat(case, number=number, repeat=5)) / number
+        print(f'{name:<40} {seconds * 1e6:8.2f} us/call')
+
+
+def main(argv: List[str]) -> None:
+    number = int(argv[0]) if argv else 20000
+    client = SagaClient(hosts=[HOST])
+
+    measure([
+        ('request build, f-string URL + json=', build_request_before),
+        ('request build, cached URL + encoded body', lambda: build_request_after(client)),
+        ('filtered log, f-string', log_before),
+        ('filtered log, lazy', lambda: log_after(client)),
+    ], number)
+
+    # Full create_group_on_host call against a transport that answers immediately
+    logging.getLogger('saga_client').setLevel(logging.WARNING)
+    transport = httpx.MockTransport(lambda request: httpx.Response(201))
+    loop = asyncio.new_event_loop()
+    http = httpx.AsyncClient(transport=transport)
+    measure([('create_group_on_host, mock transport', lambda: create_on_host(client, http, loop))], number // 10)
+    loop.run_until_complete(http.aclose())
+    loop.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
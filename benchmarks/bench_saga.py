@@ -0,0 +1,163 @@
+"""
+Saga throughput and latency benchmark against the in-process `FakeGroupService`.
+
+Run from the repository root, e.g.:
+
+    python -m benchmarks.bench_saga --hosts 10 --sagas 500 --concurrency 1 10 100 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from benchmarks.fake_service import FakeGroupService, latency_distribution
+from saga_client.batching import Batcher
+from saga_client.client import SagaClient
+from saga_client.retry import RetryPolicy
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def drive(
+        operation: Callable[[str], Awaitable[Any]],
+        group_ids: List[str],
+        concurrency: int,
+) -> Dict[str, Any]:
+    """
+    Run `operation` for every group ID with at most `concurrency` in flight and measure each call.
+
+    A call raising an exception, e.g. a host exhausting its retries under fault injection, counts as a failure.
+    """
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def run(group_id: str) -> None:
+        nonlocal failures
+        async with semaphore:
+            started_at = time.perf_counter()
+            try:
+                result = await operation(group_id)
+            except Exception:
+                failures += 1
+                return
+            finally:
+                latencies.append(time.perf_counter() - started_at)
+            # create_group returns a bool, delete_group and rollback_creation the undeleted hosts
+            if result is False or (isinstance(result, list) and result):
+                failures += 1
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(run(group_id) for group_id in group_ids))
+    elapsed = time.perf_counter() - started_at
+
+    return {
+        'sagas': len(group_ids),
+        'failures': failures,
+        'seconds': round(elapsed, 4),
+        'sagas_per_second': round(len(group_ids) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+async def run_level(args: argparse.Namespace, concurrency: int) -> Dict[str, Any]:
+    service = FakeGroupService(
+        latency=latency_distribution(args.latency, args.latency_ms / 1000, seed=args.seed),
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        lost_create_rate=args.lost_create_rate,
+        bulk=args.bulk,
+        seed=args.seed,
+    )
+    hosts = [f'http://127.0.0.1:{8000 + i}' for i in range(args.hosts)]
+    retry_policy = RetryPolicy(max_wait=args.max_wait, request_timeout=args.request_timeout)
+    group_ids = [f'bench-{concurrency}-{i}' for i in range(args.sagas)]
+
+    async with SagaClient(
+            hosts=hosts,
+            max_in_flight=args.max_in_flight or None,
+            retry_policy=retry_policy,
+            transport=service.transport(),
+            batcher=Batcher() if args.batch else None,
+    ) as client:
+        result = {'concurrency': concurrency}
+
+        result['create_group'] = await drive(client.create_group, group_ids, concurrency)
+        result['delete_group'] = await drive(client.delete_group, group_ids, concurrency)
+
+        # Rollback of groups freshly created on every host, bypassing the coordinator
+        async def create_then_rollback(group_id: str) -> List[str]:
+            async with client.session() as http:
+                created = await asyncio.gather(
+                    *(client.create_group_on_host(http, host, group_id) for host in hosts), return_exceptions=True
+                )
+                success_hosts = [host for host, ok in zip(hosts, created) if ok is True]
+                return await client.rollback_creation(http, group_id, success_hosts)
+
+        rollback_ids = [f'{group_id}-rollback' for group_id in group_ids]
+        result['rollback_creation'] = await drive(create_then_rollback, rollback_ids, concurrency)
+
+    result['requests_per_host'] = dict(service.requests)
+    result['requests_total'] = sum(service.requests.values())
+    return result
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hosts', type=int, default=3, help='number of fake hosts')
+    parser.add_argument('--sagas', type=int, default=200, help='sagas per operation and concurrency level')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50], help='concurrency levels')
+    parser.add_argument('--max-in-flight', type=int, default=0, help='per-saga host fan-out, 0 for sequential')
+    parser.add_argument('--latency', default='exponential', help='constant, uniform, exponential or lognormal')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='mean request latency in milliseconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='probability of a 503 response')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='probability of a request timeout')
+    parser.add_argument('--lost-create-rate', type=float, default=0.0, help='probability of a 404 after create')
+    parser.add_argument('--max-wait', type=float, default=0.1, help='maximum retry backoff in seconds')
+    parser.add_argument('--request-timeout', type=float, default=10.0, help='request timeout in seconds')
+    parser.add_argument('--bulk', action='store_true', help='serve the bulk endpoint on the fake hosts')
+    parser.add_argument('--batch', action='store_true', help='batch operations into bulk requests')
+    parser.add_argument('--seed', type=int, default=None, help='random seed')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    return parser.parse_args(argv)
+
+
+async def main(argv: List[str]) -> List[Dict[str, Any]]:
+    args = parse_args(argv)
+    logging.getLogger('saga_client').setLevel(logging.CRITICAL)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    results = []
+    for concurrency in args.concurrency:
+        result = await run_level(args, concurrency)
+        results.append(result)
+
+        for operation in ('create_group', 'delete_group', 'rollback_creation'):
+            stats = result[operation]
+            print(
+                f"c={concurrency:<5} {operation:<18} {stats['sagas_per_second']:>10} sagas/s  "
+                f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms "
+                f"failures={stats['failures']}"
+            )
+        print(f"c={concurrency:<5} requests={result['requests_total']}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'arguments': vars(args), 'results': results}, file, indent=2)
+
+    return results
+
+
+if __name__ == '__main__':
+    asyncio.run(main(sys.argv[1:]))
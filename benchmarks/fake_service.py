@@ -0,0 +1,132 @@
+import asyncio
+import json
+import random
+from collections import Counter
+from typing import Callable, Dict, Optional, Set
+
+import httpx
+
+
+def latency_distribution(name: str, mean: float, seed: Optional[int] = None) -> Callable[[], float]:
+    """
+    Build a latency sampler.
+
+    :param name: One of `constant`, `uniform`, `exponential` or `lognormal`.
+    :param mean: Mean latency in seconds.
+    :param seed: Seed of the random generator, for reproducible runs.
+    :return: A callable returning one latency sample in seconds.
+    """
+
+    rng = random.Random(seed)
+
+    if name == 'constant':
+        return lambda: mean
+    if name == 'uniform':
+        return lambda: rng.uniform(0, 2 * mean)
+    if name == 'exponential':
+        return lambda: rng.expovariate(1 / mean) if mean else 0.0
+    if name == 'lognormal':
+        # sigma 0.5 gives a moderate tail; mu is chosen so that the mean matches
+        return lambda: rng.lognormvariate(0, 0.5) * mean / 1.1331
+    raise ValueError(f'Unknown latency distribution {name}')
+
+
+class FakeGroupService:
+    """
+    In-process ASGI stand-in for the `/v1/group/` service of every host in a cluster.
+
+    Each host is identified by the `Host` header of the request, so a single instance behind an `httpx.ASGITransport`
+    serves any number of host URLs. Responses can be delayed, fail with 503, time out, or lose a created group so
+    that the following verification returns 404.
+    """
+
+    def __init__(
+            self,
+            latency: Callable[[], float] = lambda: 0.0,
+            error_rate: float = 0.0,
+            timeout_rate: float = 0.0,
+            lost_create_rate: float = 0.0,
+            bulk: bool = False,
+            seed: Optional[int] = None,
+    ):
+        """
+        :param latency: A callable returning the latency of one request in seconds.
+        :param error_rate: Probability that a request answers 503.
+        :param timeout_rate: Probability that a request raises `httpx.ReadTimeout`.
+        :param lost_create_rate: Probability that a successful creation is not stored, so that it verifies as 404.
+        :param bulk: Serve the `/v1/group/bulk/` endpoint of `saga_client.batching.JsonBulkEndpoint`.
+        :param seed: Seed of the random generator, for reproducible runs.
+        """
+
+        self.latency = latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.lost_create_rate = lost_create_rate
+        self.bulk = bulk
+        self.groups: Dict[str, Set[str]] = {}
+        self.requests: Counter = Counter()
+        self._rng = random.Random(seed)
+
+    def transport(self) -> httpx.ASGITransport:
+        return httpx.ASGITransport(app=self)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            return
+
+        headers = dict(scope['headers'])
+        host = f"{scope['scheme']}://{headers[b'host'].decode()}"
+        method = scope['method']
+        path = scope['path']
+
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        self.requests[host] += 1
+        await asyncio.sleep(self.latency())
+
+        if self._rng.random() < self.timeout_rate:
+            raise httpx.ReadTimeout('Simulated timeout')
+        if self._rng.random() < self.error_rate:
+            await self._respond(send, 503)
+            return
+
+        if path == '/v1/group/bulk/' and method == 'POST' and self.bulk:
+            request = json.loads(body)
+            results = {group_id: self._apply(host, request['operation'], group_id) for group_id in request['groupIds']}
+            await self._respond(send, 200, {'results': results})
+        elif path == '/v1/group/' and method == 'POST':
+            await self._respond(send, self._apply(host, 'create', json.loads(body)['groupId']))
+        elif path == '/v1/group/' and method == 'DELETE':
+            await self._respond(send, self._apply(host, 'delete', json.loads(body)['groupId']))
+        elif path.startswith('/v1/group/') and method == 'GET':
+            await self._respond(send, self._apply(host, 'verify', path[len('/v1/group/'):].rstrip('/')))
+        else:
+            await self._respond(send, 404)
+
+    def _apply(self, host: str, operation: str, group_id: str) -> int:
+        groups = self.groups.setdefault(host, set())
+
+        if operation == 'create':
+            if group_id in groups:
+                return 409
+            if self._rng.random() >= self.lost_create_rate:
+                groups.add(group_id)
+            return 201
+
+        if operation == 'delete':
+            if group_id not in groups:
+                return 404
+            groups.discard(group_id)
+            return 200
+
+        return 200 if group_id in groups else 404
+
+    @staticmethod
+    async def _respond(send, status: int, payload: Optional[dict] = None) -> None:
+        await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': json.dumps(payload or {}).encode()})
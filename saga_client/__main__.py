@@ -0,0 +1,5 @@
+import asyncio
+
+from .cli import main
+
+asyncio.run(main())
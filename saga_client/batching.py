@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+Sender = Callable[[httpx.AsyncClient, str, str, List[str]], Awaitable[Optional[Dict[str, int]]]]
+
+
+class JsonBulkEndpoint:
+    """
+    Bulk endpoint accepting one operation on many groups in a single JSON request.
+
+    The request is `POST {host}{path}` with `{"operation": ..., "groupIds": [...]}`, and the response is
+    `{"results": {group_id: status_code}}` where each status code is what the single request would have returned.
+    Subclass it, or provide an object with the same two methods, to talk to another bulk API.
+    """
+
+    UNSUPPORTED_STATUSES = frozenset({404, 405, 501})
+
+    def __init__(self, path: str = '/v1/group/bulk/'):
+        self.path = path
+
+    def build_request(
+            self,
+            host: str,
+            operation: str,
+            group_ids: List[str],
+            encoder: Callable[[Any], bytes],
+    ) -> Tuple[str, str, bytes]:
+        """
+        :return: The method, URL and JSON body of the bulk request.
+        """
+
+        return 'POST', f'{host}{self.path}', encoder({'operation': operation, 'groupIds': group_ids})
+
+    def parse_response(self, response: httpx.Response) -> Optional[Dict[str, int]]:
+        """
+        :return: The status code of each group, or `None` if the host has no bulk endpoint.
+        :raises ValueError: If the bulk request failed or its response is malformed.
+        """
+
+        if response.status_code in self.UNSUPPORTED_STATUSES:
+            return None
+        if response.status_code != 200:
+            raise ValueError(f'Bulk request failed with status {response.status_code}')
+
+        results = json.loads(response.content)['results']
+        return {group_id: int(status_code) for group_id, status_code in results.items()}
+
+
+class Batcher:
+    """
+    Gathers the operations aimed at the same host into bulk requests.
+
+    Operations wait at most `max_delay` seconds, or until `max_batch_size` of them are pending, before the batch is
+    sent. An operation the bulk response has no result for falls back to a single request. Hosts without a bulk
+    endpoint are remembered and always use single requests. When the bulk request itself fails, e.g. with a 503 or a
+    transport error, every operation of the batch fails with its exception, so that each is retried with backoff
+    instead of being sent again right away to a host that may be overloaded.
+    """
+
+    def __init__(self, endpoint=None, max_batch_size: int = 100, max_delay: float = 0.005):
+        """
+        :param endpoint: The bulk endpoint, `JsonBulkEndpoint()` by default.
+        :param max_batch_size: Maximum number of operations per bulk request.
+        :param max_delay: Maximum seconds an operation waits for its batch to fill up.
+        """
+
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be a positive integer')
+
+        self.endpoint = endpoint or JsonBulkEndpoint()
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.unsupported_hosts: Set[str] = set()
+        self._pending: Dict[Tuple[httpx.AsyncClient, str, str], List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[Tuple[httpx.AsyncClient, str, str], asyncio.TimerHandle] = {}
+        self._sending: Set[asyncio.Task] = set()
+
+    async def submit(
+            self,
+            sender: Sender,
+            client: httpx.AsyncClient,
+            host: str,
+            operation: str,
+            group_id: str,
+    ) -> Optional[int]:
+        """
+        Add an operation to the batch of its host and wait for its result.
+
+        :param sender: Coroutine function sending a bulk request and returning the status code of each group.
+        :param client: An instance of `httpx.AsyncClient` for making HTTP requests.
+        :param host: The host URL the operation is aimed at.
+        :param operation: `create`, `delete` or `verify`.
+        :param group_id: The ID of the group.
+        :return: The status code the host answered for the group, or `None` to fall back to a single request.
+        :raises Exception: The exception of the bulk request, if it failed.
+        """
+
+        if host in self.unsupported_hosts:
+            return None
+
+        loop = asyncio.get_running_loop()
+        key = (client, host, operation)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = []
+            self._timers[key] = loop.call_later(self.max_delay, self._flush, key, sender)
+
+        future = loop.create_future()
+        batch.append((group_id, future))
+        if len(batch) >= self.max_batch_size:
+            self._flush(key, sender)
+
+        return await future
+
+    def _flush(self, key: Tuple[httpx.AsyncClient, str, str], sender: Sender) -> None:
+        batch = self._pending.pop(key, None)
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._send(key, batch, sender))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(
+            self,
+            key: Tuple[httpx.AsyncClient, str, str],
+            batch: List[Tuple[str, asyncio.Future]],
+            sender: Sender,
+    ) -> None:
+        client, host, operation = key
+        group_ids = list(dict.fromkeys(group_id for group_id, _ in batch))
+
+        try:
+            results = await sender(client, host, operation, group_ids)
+        except Exception as exc:
+            logger.warning('Bulk %s of %d groups on %s failed: %s', operation, len(group_ids), host, exc)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        if results is None:
+            logger.info('Host %s has no bulk endpoint, using single requests', host)
+            self.unsupported_hosts.add(host)
+            results = {}
+
+        for group_id, future in batch:
+            if not future.done():
+                future.set_result(results.get(group_id))
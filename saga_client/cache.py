@@ -0,0 +1,134 @@
+"""
+Cache of the known state of groups on hosts, used to skip redundant verification requests.
+"""
+import time
+from collections import Counter, OrderedDict
+from typing import Optional, Tuple
+
+CREATED = 'created'
+DELETED = 'deleted'
+VERIFIED = 'verified'
+INVALIDATED = 'invalidated'
+
+
+class GroupStateCache:
+    """
+    Bounded LRU cache of `(host, group_id) -> exists`, with entries expiring after `ttl` seconds.
+
+    `SagaClient` fills it from successful creations (201), deletions (200) and verifications (200 or 404), and
+    invalidates an entry whenever a creation or deletion of the group on the host starts. A verification returns a
+    cached verification result without a request, and its own result is not cached if a creation or deletion started
+    while it was in flight. A 201 or a deletion's 200 only stands in for a verification when
+    `trust_created` or `trust_deleted` is set.
+
+    `stats` counts the lookups as `hit` and `miss`, and the entries dropped as `expired`, `evicted` and `invalidated`.
+    """
+
+    def __init__(
+            self,
+            max_size: int = 100000,
+            ttl: float = 30.0,
+            trust_created: bool = False,
+            trust_deleted: bool = False,
+    ):
+        """
+        :param max_size: Maximum number of entries, beyond which the least recently used ones are evicted.
+        :param ttl: Seconds an entry is valid for.
+        :param trust_created: Treat a group as verified when its creation returned 201 within `ttl`, so the saga's
+                              verification request is skipped.
+        :param trust_deleted: Treat a group as verified absent when its deletion returned 200 within `ttl`, so the
+                              verification of a rollback is skipped.
+        """
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.trust_created = trust_created
+        self.trust_deleted = trust_deleted
+        self.stats: Counter = Counter()
+        # (exists, source, updated_at), where invalidated entries are kept with an unknown state, `None`
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[Optional[bool], str, float]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.stats['hit'] + self.stats['miss']
+        return self.stats['hit'] / lookups if lookups else 0.0
+
+    def get(self, host: str, group_id: str) -> Optional[bool]:
+        """
+        :return: Whether the group exists on the host, or `None` when that is not known with enough confidence to
+                 skip a verification.
+        """
+
+        key = (host, group_id)
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            exists, source, updated_at = entry
+            if updated_at + self.ttl <= time.monotonic():
+                del self._entries[key]
+                if exists is not None:
+                    self.stats['expired'] += 1
+            elif exists is not None and self._trusted(source):
+                self._entries.move_to_end(key)
+                self.stats['hit'] += 1
+                return exists
+
+        self.stats['miss'] += 1
+        return None
+
+    def _trusted(self, source: str) -> bool:
+        if source == CREATED:
+            return self.trust_created
+        if source == DELETED:
+            return self.trust_deleted
+        return True
+
+    def set(
+            self,
+            host: str,
+            group_id: str,
+            exists: Optional[bool],
+            source: str = VERIFIED,
+            since: Optional[float] = None,
+    ) -> None:
+        """
+        Record the state of a group on a host, as learned from a `created`, `deleted` or `verified` response.
+
+        :param since: The `time.monotonic()` at which the request was sent. The state is not recorded if the entry was
+                      updated or invalidated since then.
+        """
+
+        key = (host, group_id)
+        if since is not None:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] >= since:
+                return
+
+        self._entries[key] = (exists, source, time.monotonic())
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats['evicted'] += 1
+
+    def invalidate(self, host: str, group_id: str) -> None:
+        """
+        Forget the state of a group on a host, before it is changed.
+        """
+
+        entry = self._entries.get((host, group_id))
+        if entry is not None and entry[0] is not None:
+            self.stats['invalidated'] += 1
+        self.set(host, group_id, None, INVALIDATED)
+
+    def invalidate_host(self, host: str) -> None:
+        """
+        Drop all entries of a host, e.g. one removed from the cluster.
+        """
+
+        for key in [key for key in self._entries if key[0] == host]:
+            if self._entries.pop(key)[0] is not None:
+                self.stats['invalidated'] += 1
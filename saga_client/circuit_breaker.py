@@ -0,0 +1,91 @@
+import logging
+import time
+from typing import Callable, Optional
+
+from .exceptions import CircuitOpenException
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker guarding the requests sent to a single host.
+
+    The breaker starts `closed` and lets every request through. After `failure_threshold` consecutive failures it
+    becomes `open` and rejects requests immediately. Once `recovery_timeout` seconds have passed it becomes
+    `half_open` and lets exactly one probe request through: a success closes the circuit again, a failure re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+            self,
+            host: str,
+            failure_threshold: int = 5,
+            recovery_timeout: float = 30.0,
+            on_state_change: Optional[Callable[[str, str, str], None]] = None,
+    ):
+        """
+        :param host: The host URL guarded by this breaker.
+        :param failure_threshold: Number of consecutive failures that opens the circuit.
+        :param recovery_timeout: Seconds to wait in the `open` state before allowing a probe request.
+        :param on_state_change: Called with the host, the old state and the new state on every state change.
+        """
+
+        if failure_threshold < 1:
+            raise ValueError('failure_threshold must be a positive integer')
+
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.on_state_change = on_state_change
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_request(self) -> None:
+        """
+        Check whether a request may be sent to the host.
+
+        :raises CircuitOpenException: If the circuit is open, or half-open with a probe already in flight.
+        """
+
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.recovery_timeout:
+                raise CircuitOpenException(self.host)
+            self._set_state(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                raise CircuitOpenException(self.host)
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        self._probe_in_flight = False
+        self.failures = 0
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            if self.state != self.OPEN:
+                self._set_state(self.OPEN)
+
+    def release(self) -> None:
+        """
+        Give up a request without recording an outcome, e.g. when it was cancelled.
+        """
+
+        self._probe_in_flight = False
+
+    def _set_state(self, state: str) -> None:
+        logger.warning(f'Circuit for {self.host} changed from {self.state} to {state}')
+        old_state, self.state = self.state, state
+        if self.on_state_change is not None:
+            self.on_state_change(self.host, old_state, state)
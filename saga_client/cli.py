@@ -0,0 +1,171 @@
+"""
+Replay a JSONL stream of group operations through `SagaClient`.
+
+Each input line is a JSON object such as `{"operation": "create", "group_id": "g1"}`, where the operation is
+`create`, `delete` or `verify`. One JSON result line is written per operation as it completes, and a throughput
+summary is printed to stderr at the end. Input is read lazily, so memory use does not depend on its size.
+
+    python -m saga_client operations.jsonl --concurrency 200 > results.jsonl
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import IO, Any, AsyncIterator, Dict, List, Optional
+
+from . import config
+from .client import SagaClient, run_many
+from .retry import RetryPolicy
+
+OPERATIONS = ('create', 'delete', 'verify')
+
+
+async def read_records(file: IO[str]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Read JSON records from a file without blocking the event loop.
+
+    Lines are read one at a time, so each record is handed out as soon as it arrives, even from a live pipe.
+    Lines that are not valid records are yielded as `{'error': ...}` so that they get a result line too.
+    """
+
+    loop = asyncio.get_running_loop()
+    line_number = 0
+
+    while True:
+        line = await loop.run_in_executor(None, file.readline)
+        if not line:
+            return
+
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if record.get('operation') not in OPERATIONS or not isinstance(record.get('group_id'), str):
+                raise ValueError('expected {"operation": "create|delete|verify", "group_id": "..."}')
+        except (ValueError, AttributeError) as exc:
+            record = {'line': line_number, 'error': f'invalid record: {exc}'}
+        yield record
+
+
+async def run_operation(client: SagaClient, record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one operation and build its result line.
+    """
+
+    if 'error' in record:
+        return {**record, 'success': False}
+
+    operation = record['operation']
+    group_id = record['group_id']
+    started = time.perf_counter()
+    result: Dict[str, Any] = {'operation': operation, 'group_id': group_id}
+
+    try:
+        if operation == 'create':
+            result['success'] = await client.create_group(group_id)
+        else:
+            if operation == 'delete':
+                failed_hosts = await client.delete_group(group_id)
+            else:
+                failed_hosts = await client.verify_group(group_id)
+            result['success'] = not failed_hosts
+            result['failed_hosts'] = failed_hosts
+    except Exception as exc:
+        result['success'] = False
+        result['error'] = str(exc)
+
+    result['seconds'] = round(time.perf_counter() - started, 6)
+    return result
+
+
+async def replay(
+        client: SagaClient,
+        input_file: IO[str],
+        output_file: IO[str],
+        concurrency: int,
+) -> Dict[str, Any]:
+    """
+    Stream the records of `input_file` through `client` with at most `concurrency` operations in flight.
+
+    :return: The throughput summary.
+    """
+
+    started = time.perf_counter()
+    total = succeeded = 0
+
+    async for _, result in run_many(
+            lambda record: run_operation(client, record), read_records(input_file), concurrency
+    ):
+        output_file.write(json.dumps(result) + '\n')
+        total += 1
+        succeeded += bool(result['success'])
+
+    output_file.flush()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'operations': total,
+        'succeeded': succeeded,
+        'failed': total - succeeded,
+        'seconds': round(elapsed, 3),
+        'operations_per_second': round(total / elapsed, 2) if elapsed else None,
+    }
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'{value} is not a positive integer')
+    return number
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m saga_client', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', nargs='?', default='-', help='JSONL file of operations, or - for stdin')
+    parser.add_argument('-o', '--output', default='-', help='JSONL file of results, or - for stdout')
+    parser.add_argument('--hosts', help='comma-separated host URLs, defaults to the HOSTS environment variable')
+    parser.add_argument('--concurrency', type=positive_int, default=100, help='maximum operations in flight')
+    parser.add_argument('--max-in-flight', type=positive_int, default=None, help='maximum host requests in flight per saga')
+    parser.add_argument('--max-per-host', type=positive_int, default=None, help='maximum requests in flight per host')
+    parser.add_argument('--saga-timeout', type=float, default=None, help='deadline of each operation in seconds')
+    parser.add_argument('--request-timeout', type=float, default=10, help='timeout of each request in seconds')
+    parser.add_argument('-v', '--verbose', action='store_true', help='log every request')
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    hosts = [host.strip() for host in args.hosts.split(',') if host.strip()] if args.hosts else config.HOSTS
+    input_file = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+
+    try:
+        async with SagaClient(
+                hosts=hosts,
+                max_in_flight=args.max_in_flight,
+                max_per_host=args.max_per_host,
+                saga_timeout=args.saga_timeout,
+                retry_policy=RetryPolicy(request_timeout=args.request_timeout),
+        ) as client:
+            summary = await replay(client, input_file, output_file, args.concurrency)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    print(
+        f"{summary['operations']} operations ({summary['succeeded']} succeeded, {summary['failed']} failed) "
+        f"in {summary['seconds']}s, {summary['operations_per_second']} operations/s",
+        file=sys.stderr,
+    )
+    return summary
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
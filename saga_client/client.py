@@ -1,24 +1,573 @@
+import asyncio
+import functools
+import httpcore
 import httpx
+import json
 import logging
-from typing import List
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import time
+from collections import Counter
+from contextlib import ExitStack, asynccontextmanager, contextmanager, nullcontext
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union,
+)
 
-from .config import HOSTS
+from .batching import Batcher
+from .cache import CREATED, DELETED, GroupStateCache
+from .circuit_breaker import CircuitBreaker
+from . import config
 from .coordinator import SagaCoordinator
-from .exceptions import RequestErrorException
+from .exceptions import RequestErrorException, RetryableStatusException
+from .hedging import HedgePolicy
+from .instrumentation import Hooks, current_saga_id
+from .journal import SagaJournal
+from .limiter import AdaptiveLimit
+from .membership import HostProvider
+from .retry import RetryPolicy, check_deadline, deadline, retry_with_policy, wait_before_deadline
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+def _encode_json(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(',', ':')).encode()
+
 
 class SagaClient:
-    def __init__(self, hosts: List[str] = HOSTS):
-        self.hosts = hosts
-
-    @retry(
-        retry=retry_if_exception_type(RequestErrorException),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10)
-    )
+    def __init__(
+            self,
+            hosts: Optional[List[str]] = None,
+            max_in_flight: Optional[int] = None,
+            limits: Optional[httpx.Limits] = None,
+            keepalive_expiry: Optional[float] = None,
+            http2: bool = False,
+            max_per_host: Optional[int] = None,
+            rollback_concurrency: Optional[int] = None,
+            rollback_timeout: Optional[float] = None,
+            circuit_failure_threshold: Optional[int] = None,
+            circuit_recovery_timeout: float = 30.0,
+            retry_policy: Optional[RetryPolicy] = None,
+            saga_timeout: Optional[float] = None,
+            hedge_policy: Optional[HedgePolicy] = None,
+            journal: Optional[SagaJournal] = None,
+            transport: Optional[httpx.AsyncBaseTransport] = None,
+            hooks: Optional[Hooks] = None,
+            json_encoder: Optional[Callable[[Any], bytes]] = None,
+            log_sample_rate: Union[float, Dict[str, float]] = 1.0,
+            adaptive_limit: Optional[AdaptiveLimit] = None,
+            batcher: Optional[Batcher] = None,
+            host_provider: Optional[HostProvider] = None,
+            state_cache: Optional[GroupStateCache] = None,
+    ):
+        """
+        :param hosts: A list of host URLs that make up the cluster. Defaults to the `HOSTS` environment variable.
+        :param max_in_flight: Maximum number of concurrent host requests per saga. When `None`,
+                              hosts are processed one after another.
+        :param limits: Connection pool limits of the shared `httpx.AsyncClient`.
+        :param keepalive_expiry: Seconds an idle keep-alive connection is kept open. Overrides the
+                                 value in `limits` when given.
+        :param http2: Enable HTTP/2 on the shared client. Requires the `h2` package.
+        :param max_per_host: Maximum number of concurrent requests to any single host, across all
+                             sagas of this client. When `None`, requests are not limited per host.
+        :param rollback_concurrency: Maximum number of hosts compensated at the same time during a rollback.
+                                     When `None`, all hosts are compensated at once.
+        :param rollback_timeout: Overall deadline in seconds for a rollback. Hosts not compensated by then
+                                 are reported as undeleted. When `None`, there is no deadline.
+        :param circuit_failure_threshold: Consecutive failures after which a host's circuit breaker opens and
+                                          requests to it fail immediately. When `None`, circuit breaking is disabled.
+        :param circuit_recovery_timeout: Seconds an open circuit waits before letting a single probe request through.
+        :param retry_policy: Retry, backoff and request timeout settings of the per-host requests.
+        :param saga_timeout: Deadline in seconds of each `create_group` and `delete_group`. No request or retry
+                             starts after it, and request timeouts are cut down to the remaining time.
+        :param hedge_policy: Hedge slow verification requests with a second request. When `None`, no hedging.
+        :param journal: Journal recording the steps of every `create_group` saga, so that `recover` can compensate
+                        sagas left unfinished by a crash.
+        :param transport: Custom transport of the `httpx.AsyncClient`, e.g. an `httpx.ASGITransport` for a local
+                          stand-in service. `limits` and `http2` apply to the default transport only.
+        :param hooks: Instrumentation hooks receiving saga, step, retry, rollback and circuit events.
+        :param json_encoder: Callable encoding request bodies to JSON bytes. Defaults to `orjson.dumps` when `orjson`
+                             is installed, and to the standard library otherwise.
+        :param log_sample_rate: Fraction of successful per-host requests that are logged, either for all hosts or as
+                                a mapping of host to rate. Failures are always logged.
+        :param adaptive_limit: Adapt the concurrency limit of each host to its latency and overload signals (AIMD),
+                               with an optional per-host rate cap. Applies within `max_per_host` when both are set.
+        :param batcher: Gather per-host operations into bulk requests. When `None`, every operation is its own request.
+        :param host_provider: Source of membership changes, watched inside `async with SagaClient(...)`, which are
+                              applied with `update_hosts`. When `None`, hosts change only through `update_hosts`.
+        :param state_cache: Cache of the known state of groups on hosts, which answers verifications without a request
+                            while fresh. When `None`, every verification sends a request.
+        """
+
+        if rollback_concurrency is not None and rollback_concurrency < 1:
+            raise ValueError('rollback_concurrency must be a positive integer')
+
+        self.hosts = hosts if hosts is not None else config.HOSTS
+        self.max_in_flight = max_in_flight
+        self.limits = limits or httpx.Limits()
+        if keepalive_expiry is not None:
+            self.limits = httpx.Limits(
+                max_connections=self.limits.max_connections,
+                max_keepalive_connections=self.limits.max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            )
+        self.http2 = http2
+        self.max_per_host = max_per_host
+        self.rollback_concurrency = rollback_concurrency
+        self.rollback_timeout = rollback_timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._group_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        self.circuit_failure_threshold = circuit_failure_threshold
+        self.circuit_recovery_timeout = circuit_recovery_timeout
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.saga_timeout = saga_timeout
+        self.hedge_policy = hedge_policy
+        self.journal = journal
+        self.transport = transport
+        self.hooks = hooks
+        self.json_encoder = json_encoder or (orjson.dumps if orjson is not None else _encode_json)
+        self.log_sample_rate = log_sample_rate
+        self._log_counts: Dict[str, int] = {}
+        self._collection_urls: Dict[str, str] = {}
+        self.adaptive_limit = adaptive_limit
+        self.batcher = batcher
+        self.host_provider = host_provider
+        self.state_cache = state_cache
+        self._host_watch: Optional[asyncio.Task] = None
+        self._membership_lock = asyncio.Lock()
+        # sagas running per membership generation, which removed hosts are drained of before their state is dropped
+        self._generation = 0
+        self._active_sagas: Counter = Counter()
+        self._sagas_finished = asyncio.Event()
+
+    async def __aenter__(self) -> 'SagaClient':
+        if self._client is None:
+            self._client = self._build_client()
+        if self.host_provider is not None and self._host_watch is None:
+            self._host_watch = asyncio.create_task(self._watch_hosts())
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """
+        Stop watching the host provider, wait for background deletions and drains to finish, then close the journal
+        and the shared connection pool, if open.
+        """
+
+        if self._host_watch is not None:
+            self._host_watch.cancel()
+            await asyncio.gather(self._host_watch, return_exceptions=True)
+            self._host_watch = None
+
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+
+        if self.journal is not None:
+            await self.journal.close()
+
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(limits=self.limits, http2=self.http2, transport=self.transport)
+
+    async def update_hosts(self, hosts: List[str]) -> None:
+        """
+        Change the cluster membership without interrupting running sagas.
+
+        New hosts are warmed up with a request opening a pooled connection before any saga uses them. Sagas keep the
+        hosts they started with, and the state and idle connections of removed hosts are dropped in the background
+        once the last saga started before the change has finished.
+
+        :param hosts: The new list of host URLs.
+        """
+
+        async with self._membership_lock:
+            hosts = list(dict.fromkeys(hosts))
+            if hosts == self.hosts:
+                return
+
+            added = [host for host in hosts if host not in self.hosts]
+            removed = [host for host in self.hosts if host not in hosts]
+            if added:
+                await self._warm_up(added)
+
+            self.hosts = hosts
+            self._generation += 1
+            logger.info(f'Cluster membership changed, added hosts: {added}, removed hosts: {removed}')
+
+            if removed:
+                task = asyncio.create_task(self._drain(removed, self._generation))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+
+    async def _watch_hosts(self) -> None:
+        async for hosts in self.host_provider.watch():
+            try:
+                await self.update_hosts(hosts)
+            except Exception as exc:
+                logger.error(f'Failed to update the cluster membership. Detail: {exc}')
+
+    @contextmanager
+    def _membership_snapshot(self) -> Iterator[List[str]]:
+        """
+        Provide the hosts of one saga, and keep removed hosts from being drained while it runs.
+        """
+
+        generation = self._generation
+        self._active_sagas[generation] += 1
+        try:
+            yield self.hosts
+        finally:
+            self._active_sagas[generation] -= 1
+            if not self._active_sagas[generation]:
+                del self._active_sagas[generation]
+                self._sagas_finished.set()
+
+    async def _warm_up(self, hosts: List[str]) -> None:
+        if self._client is None:
+            return
+
+        async def warm_up(host: str) -> None:
+            try:
+                await self._client.head(host, timeout=self.retry_policy.request_timeout)
+            except httpx.HTTPError as exc:
+                logger.warning(f'Warm-up of host {host} failed: {exc}')
+
+        await asyncio.gather(*(warm_up(host) for host in hosts))
+
+    async def _drain(self, removed: List[str], generation: int) -> None:
+        while any(started < generation for started in self._active_sagas):
+            self._sagas_finished.clear()
+            await self._sagas_finished.wait()
+
+        removed = [host for host in removed if host not in self.hosts]
+        for host in removed:
+            self._host_semaphores.pop(host, None)
+            self.circuit_breakers.pop(host, None)
+            self._collection_urls.pop(host, None)
+            self._log_counts.pop(host, None)
+            if self.state_cache is not None:
+                self.state_cache.invalidate_host(host)
+            if self.adaptive_limit is not None:
+                self.adaptive_limit.limiters.pop(host, None)
+
+        if removed:
+            await self._close_idle_connections(removed)
+
+        logger.info(f'Drained removed hosts {removed}')
+
+    async def _close_idle_connections(self, hosts: List[str]) -> None:
+        """
+        Close the idle pooled connections to `hosts`, so they do not linger until their keep-alive expires.
+
+        This reaches into the connection pool of httpx's default transport. Custom transports have no such pool, and
+        if the internals of httpx or httpcore change, the connections are left to expire instead.
+        """
+
+        pool = getattr(getattr(self._client, '_transport', None), '_pool', None)
+        if not isinstance(pool, httpcore.AsyncConnectionPool):
+            return
+
+        try:
+            origins = [_origin(host) for host in hosts]
+            idle = [
+                connection for connection in list(pool.connections)
+                if connection.is_idle() and any(connection.can_handle_request(origin) for origin in origins)
+            ]
+        except (AttributeError, TypeError) as exc:
+            logger.warning(f'Could not close idle connections to removed hosts, leaving them to expire: {exc}')
+            return
+
+        for connection in idle:
+            await connection.aclose()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        Provide the `httpx.AsyncClient` to use for one saga.
+
+        Inside `async with SagaClient(...)` this is the shared, pooled client, which is left open.
+        Otherwise a short-lived client is opened and closed around the saga.
+        """
+
+        if self._client is not None:
+            yield self._client
+            return
+
+        async with self._build_client() as client:
+            yield client
+
+    @asynccontextmanager
+    async def _host_slot(self, host: str) -> AsyncIterator[None]:
+        """
+        Hold one of the `max_per_host` request slots of a host for the duration of a request.
+
+        :raises DeadlineExceededException: If the saga deadline passes while waiting for a slot.
+        """
+
+        if self.max_per_host is None:
+            yield
+            return
+
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+
+        if semaphore.locked():
+            await wait_before_deadline(semaphore.acquire(), host)
+        else:
+            await semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def _circuit_breaker(self, host: str) -> Optional[CircuitBreaker]:
+        if self.circuit_failure_threshold is None:
+            return None
+
+        breaker = self.circuit_breakers.get(host)
+        if breaker is None:
+            on_state_change = None
+            if self.hooks is not None:
+                on_state_change = functools.partial(self._emit_circuit_state, self.hooks)
+            breaker = self.circuit_breakers[host] = CircuitBreaker(
+                host, self.circuit_failure_threshold, self.circuit_recovery_timeout, on_state_change
+            )
+        return breaker
+
+    @staticmethod
+    def _emit_circuit_state(hooks: Hooks, host: str, old_state: str, new_state: str) -> None:
+        hooks.emit('circuit_state', host=host, old_state=old_state, new_state=new_state)
+
+    async def _request(
+            self,
+            host: str,
+            step: str,
+            send: Callable[[float], Awaitable[httpx.Response]],
+            idempotent: bool = False,
+    ) -> httpx.Response:
+        """
+        Send one request to a host through its circuit breaker and request slot.
+
+        The request timeout is taken from the `retry_policy` once the request slots are held, right before the request
+        is sent, so that it is cut down to the time left until the saga deadline after any wait for a slot.
+
+        :param host: The host URL the request is sent to.
+        :param step: The saga step of the request, e.g. `create`, `delete` or `verify`, for instrumentation.
+        :param send: A callable that performs the request with the given timeout in seconds.
+        :param idempotent: Whether the request may be hedged according to the `hedge_policy`.
+        :return: The response of the host.
+        :raises CircuitOpenException: If the host's circuit is open.
+        :raises DeadlineExceededException: If the saga deadline passes before the request is sent.
+        :raises RetryableStatusException: If the response status is retried by the `retry_policy`.
+        """
+
+        if self.hooks is None:
+            return await self._send(host, send, idempotent)
+
+        saga_id = current_saga_id()
+        started_at = time.time()
+        started = time.perf_counter()
+        status_code = None
+        error = None
+
+        self.hooks.emit('step_start', saga_id=saga_id, host=host, step=step)
+        try:
+            response = await self._send(host, send, idempotent)
+            status_code = response.status_code
+            return response
+        except RetryableStatusException as exc:
+            status_code = exc.status_code
+            raise
+        except BaseException as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            self.hooks.emit(
+                'step_end',
+                saga_id=saga_id,
+                host=host,
+                step=step,
+                status_code=status_code,
+                error=error,
+                started_at=started_at,
+                duration=time.perf_counter() - started,
+            )
+
+    async def _send(
+            self,
+            host: str,
+            send: Callable[[float], Awaitable[httpx.Response]],
+            idempotent: bool,
+    ) -> httpx.Response:
+        check_deadline(host)
+        if idempotent and self.hedge_policy is not None:
+            # Each request of a hedge holds its own request slots and goes through the circuit breaker
+            return await self.hedge_policy.send(
+                host, functools.partial(self._send_once, host, send), functools.partial(self._can_hedge, host)
+            )
+        return await self._send_once(host, send)
+
+    async def _send_once(
+            self,
+            host: str,
+            send: Callable[[float], Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        send = functools.partial(self._send_before_deadline, host, send)
+        if self.adaptive_limit is not None:
+            send = functools.partial(self._limited, host, send)
+
+        breaker = self._circuit_breaker(host)
+        if breaker is None:
+            async with self._host_slot(host):
+                response = await send()
+            self.retry_policy.check_response(host, response)
+            return response
+
+        breaker.before_request()
+        try:
+            async with self._host_slot(host):
+                response = await send()
+        except httpx.RequestError:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        self.retry_policy.check_response(host, response)
+        return response
+
+    def _can_hedge(self, host: str) -> bool:
+        """
+        :return: Whether a hedged request to `host` can be sent right away, i.e. its circuit is closed and it has a free
+                 `max_per_host` slot and adaptive limit slot.
+        """
+
+        breaker = self.circuit_breakers.get(host)
+        if breaker is not None and breaker.state != CircuitBreaker.CLOSED:
+            return False
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is not None and semaphore.locked():
+            return False
+        if self.adaptive_limit is not None and not self.adaptive_limit.limiter(host).available():
+            return False
+        return True
+
+    async def _send_before_deadline(
+            self,
+            host: str,
+            send: Callable[[float], Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        return await send(self.retry_policy.timeout(host))
+
+    async def _limited(self, host: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """
+        Send a request within the adaptive concurrency limit of the host, and feed its outcome back to the limit.
+        """
+
+        limiter = self.adaptive_limit.limiter(host)
+        await wait_before_deadline(limiter.acquire(), host)
+
+        started = time.perf_counter()
+        latency = None
+        overloaded = False
+        try:
+            response = await send()
+            latency = time.perf_counter() - started
+            overloaded = response.status_code in (429, 503)
+            return response
+        except httpx.TimeoutException:
+            latency = time.perf_counter() - started
+            overloaded = True
+            raise
+        finally:
+            limiter.release(latency, overloaded)
+
+    async def _batched(self, client: httpx.AsyncClient, host: str, operation: str, group_id: str) -> Optional[int]:
+        """
+        :return: The status code of the operation answered through a bulk request, or `None` if batching is disabled
+                 or the operation has to fall back to a single request.
+        :raises RetryableStatusException: If the bulk request or its answer for the operation has a retried status.
+        :raises DeadlineExceededException: If the saga deadline passes while waiting for the batch.
+        """
+
+        if self.batcher is None:
+            return None
+
+        status_code = await wait_before_deadline(
+            self.batcher.submit(self._bulk_request, client, host, operation, group_id), host
+        )
+        if status_code is not None and status_code in self.retry_policy.retry_statuses:
+            # Back off like a single request would, instead of sending one right away to an overloaded host
+            raise RetryableStatusException(host, status_code)
+        return status_code
+
+    async def _bulk_request(
+            self,
+            client: httpx.AsyncClient,
+            host: str,
+            operation: str,
+            group_ids: List[str],
+    ) -> Optional[Dict[str, int]]:
+        """
+        Send one bulk request through the circuit breaker and limits of the host.
+
+        :return: The status code of each group, or `None` if the host has no bulk endpoint.
+        """
+
+        endpoint = self.batcher.endpoint
+        method, url, body = endpoint.build_request(host, operation, group_ids, self.json_encoder)
+
+        response = await self._request(
+            host,
+            f'bulk_{operation}',
+            lambda timeout: client.request(method=method, url=url, content=body, headers=JSON_HEADERS, timeout=timeout),
+        )
+        return endpoint.parse_response(response)
+
+    def _collection_url(self, host: str) -> str:
+        url = self._collection_urls.get(host)
+        if url is None:
+            url = self._collection_urls[host] = f'{host}/v1/group/'
+        return url
+
+    def _log_sampled(self, host: str) -> bool:
+        """
+        :return: Whether the next successful request to `host` should be logged, according to `log_sample_rate`.
+        """
+
+        rate = self.log_sample_rate
+        if isinstance(rate, dict):
+            rate = rate.get(host, 1.0)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+
+        count = self._log_counts[host] = self._log_counts.get(host, 0) + 1
+        # log whenever count * rate crosses an integer, i.e. exactly a `rate` fraction of the calls
+        return int(count * rate) != int((count - 1) * rate)
+
+    @retry_with_policy
     async def create_group_on_host(self, client: httpx.AsyncClient, host: str, group_id: str) -> bool:
         """
         Create a group on a specific host.
@@ -29,26 +578,36 @@ class SagaClient:
         :return: `True` if the group is successfully created; `False` otherwise.
         """
 
-        url = f'{host}/v1/group/'
+        url = self._collection_url(host)
+        body = self.json_encoder({'groupId': group_id})
+        if self.state_cache is not None:
+            self.state_cache.invalidate(host, group_id)
 
         try:
-            response = await client.post(url, json={'groupId': group_id}, timeout=10)
-            if response.status_code == 201:
-                logger.info(f'Group {group_id} created on {host}')
+            status_code = await self._batched(client, host, 'create', group_id)
+            if status_code is None:
+                response = await self._request(
+                    host,
+                    'create',
+                    lambda timeout: client.post(url, content=body, headers=JSON_HEADERS, timeout=timeout),
+                )
+                status_code = response.status_code
+
+            if status_code == 201:
+                if self.state_cache is not None:
+                    self.state_cache.set(host, group_id, True, CREATED)
+                if logger.isEnabledFor(logging.INFO) and self._log_sampled(host):
+                    logger.info('Group %s created on %s', group_id, host)
                 return True
 
-            logger.error(f'Failed to create group on {host}: {response.status_code}')
+            logger.error('Failed to create group on %s: %s', host, status_code)
             return False
 
         except httpx.RequestError as exc:
-            logger.error(f'Request error occurred while creating group on {host}: {exc}')
+            logger.error('Request error occurred while creating group on %s: %s', host, exc)
             raise RequestErrorException(host, str(exc))
 
-    @retry(
-        retry=retry_if_exception_type(RequestErrorException),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10)
-    )
+    @retry_with_policy
     async def _delete_group_on_host(self, client: httpx.AsyncClient, host: str, group_id: str) -> bool:
         """
         Delete a group from a specific host.
@@ -59,26 +618,38 @@ class SagaClient:
         :return: `True` if the group is successfully deleted; `False` otherwise.
         """
 
-        url = f'{host}/v1/group/'
+        url = self._collection_url(host)
+        body = self.json_encoder({'groupId': group_id})
+        if self.state_cache is not None:
+            self.state_cache.invalidate(host, group_id)
 
         try:
-            response = await client.request(method='DELETE', url=url, json={'groupId': group_id}, timeout=10)
-            if response.status_code == 200:
-                logger.info(f'Group {group_id} deleted from {host}')
+            status_code = await self._batched(client, host, 'delete', group_id)
+            if status_code is None:
+                response = await self._request(
+                    host,
+                    'delete',
+                    lambda timeout: client.request(
+                        method='DELETE', url=url, content=body, headers=JSON_HEADERS, timeout=timeout
+                    ),
+                )
+                status_code = response.status_code
+
+            if status_code == 200:
+                if self.state_cache is not None:
+                    self.state_cache.set(host, group_id, False, DELETED)
+                if logger.isEnabledFor(logging.INFO) and self._log_sampled(host):
+                    logger.info('Group %s deleted from %s', group_id, host)
                 return True
 
-            logger.error(f'Failed to delete group on {host}: {response.status_code}')
+            logger.error('Failed to delete group on %s: %s', host, status_code)
             return False
 
         except httpx.RequestError as exc:
-            logger.error(f'Request error occurred while deleting group on {host}: {exc}')
+            logger.error('Request error occurred while deleting group on %s: %s', host, exc)
             raise RequestErrorException(host, str(exc))
 
-    @retry(
-        retry=retry_if_exception_type(RequestErrorException),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10)
-    )
+    @retry_with_policy
     async def verify_group_on_host(self, client: httpx.AsyncClient, host: str, group_id: str) -> bool:
         """
         Verify that a group exists on a specific host.
@@ -89,22 +660,39 @@ class SagaClient:
         :return: `True` if the group exists on the host; `False` otherwise.
         """
 
-        url = f'{host}/v1/group/{group_id}/'
+        if self.state_cache is not None:
+            exists = self.state_cache.get(host, group_id)
+            if exists is not None:
+                return exists
+            sent_at = time.monotonic()
+
+        url = self._collection_url(host) + group_id + '/'
 
         try:
-            response = await client.get(url, timeout=10)
-            if response.status_code == 200:
-                logger.info(f'Group {group_id} verified on {host}')
+            status_code = await self._batched(client, host, 'verify', group_id)
+            if status_code is None:
+                response = await self._request(
+                    host, 'verify', lambda timeout: client.get(url, timeout=timeout), idempotent=True
+                )
+                status_code = response.status_code
+
+            if status_code == 200:
+                if self.state_cache is not None:
+                    self.state_cache.set(host, group_id, True, since=sent_at)
+                if logger.isEnabledFor(logging.INFO) and self._log_sampled(host):
+                    logger.info('Group %s verified on %s', group_id, host)
                 return True
-            elif response.status_code == 404:
-                logger.warning(f'Group {group_id} not found on {host}')
+            elif status_code == 404:
+                if self.state_cache is not None:
+                    self.state_cache.set(host, group_id, False, since=sent_at)
+                logger.warning('Group %s not found on %s', group_id, host)
                 return False
             else:
-                logger.error(f'Failed to verify group on {host}: {response.status_code}')
+                logger.error('Failed to verify group on %s: %s', host, status_code)
                 return False
 
         except httpx.RequestError as exc:
-            logger.error(f'Request error occurred while verifying group on {host}: {exc}')
+            logger.error('Request error occurred while verifying group on %s: %s', host, exc)
             raise RequestErrorException(host, str(exc))
 
     async def rollback_creation(self, client: httpx.AsyncClient, group_id: str, success_hosts: List[str]) -> List[str]:
@@ -112,6 +700,10 @@ class SagaClient:
         Rollback group creation on hosts where it was successfully created.
         Verifies the rollback and returns any hosts where the group remains undeleted.
 
+        The delete and verify chains of all hosts run concurrently, at most `rollback_concurrency` at a time.
+        Hosts whose chain has not finished within `rollback_timeout` seconds are cancelled and reported as undeleted.
+        Cancelling the rollback cancels the chains of all hosts.
+
         :param client: An instance of `httpx.AsyncClient` for making HTTP requests.
         :param group_id: The ID of the group to delete.
         :param success_hosts: A list of hosts where the group was successfully created.
@@ -120,58 +712,448 @@ class SagaClient:
 
         logger.info('Rolling back creation on successful hosts...')
 
-        undeleted_hosts = []
+        if not success_hosts:
+            return []
 
-        for host in success_hosts:
-            try:
-                if not await self._delete_group_on_host(client, host, group_id):
-                    logger.error(f'Failed to rollback creation on {host}')
-                    undeleted_hosts.append(host)
-                else:
-                    # Verify deletion
-                    if await self.verify_group_on_host(client, host, group_id):
-                        logger.error(f'Group {group_id} still exists on {host} after rollback attempt')
-                        undeleted_hosts.append(host)
-
-            except RequestErrorException as exc:
-                logger.error(f'Error during rollback on {host}: {exc}')
-                undeleted_hosts.append(host)
+        semaphore = asyncio.Semaphore(self.rollback_concurrency) if self.rollback_concurrency else None
+
+        async def rollback_host(host: str) -> bool:
+            if semaphore is None:
+                return await self._rollback_host(client, host, group_id)
+            async with semaphore:
+                return await self._rollback_host(client, host, group_id)
+
+        tasks = {host: asyncio.create_task(rollback_host(host)) for host in success_hosts}
+        try:
+            done, pending = await asyncio.wait(tasks.values(), timeout=self.rollback_timeout)
+        except asyncio.CancelledError:
+            # Do not leave the rollbacks of the hosts running without an owner
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.error(f'Rollback of group {group_id} did not finish within {self.rollback_timeout}s')
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        undeleted_hosts = [host for host, task in tasks.items() if task not in done or not task.result()]
 
         if len(undeleted_hosts) == 0:
             logger.info('Roll back performed successfully.')
 
+        if self.hooks is not None:
+            self.hooks.emit(
+                'rollback',
+                saga_id=current_saga_id(),
+                group_id=group_id,
+                hosts=list(success_hosts),
+                undeleted_hosts=undeleted_hosts,
+            )
+
         return undeleted_hosts
 
+    async def _rollback_host(self, client: httpx.AsyncClient, host: str, group_id: str) -> bool:
+        """
+        Delete a group from one host and verify that it is gone.
+
+        :param client: An instance of `httpx.AsyncClient` for making HTTP requests.
+        :param host: The host URL where the group is to be deleted.
+        :param group_id: The ID of the group to delete.
+        :return: `True` if the group no longer exists on the host; `False` otherwise.
+        """
+
+        try:
+            if not await self._delete_group_on_host(client, host, group_id):
+                logger.error(f'Failed to rollback creation on {host}')
+                return False
+
+            # Verify deletion
+            if await self.verify_group_on_host(client, host, group_id):
+                logger.error(f'Group {group_id} still exists on {host} after rollback attempt')
+                return False
+
+            return True
+
+        except Exception as exc:
+            logger.error(f'Error during rollback on {host}: {exc}')
+            return False
+
     async def create_group(self, group_id: str) -> bool:
         """
         Create a group using a saga coordinator to manage the process.
 
+        Concurrent calls for the same group share one saga, and run after any deletion of that group in progress.
+
+        With a `journal`, a failed journal write is logged rather than raised. If the begin record of the saga cannot
+        be written, no host is touched and `False` is returned. If the end record cannot be written, the outcome of
+        the saga is returned, but the saga stays unfinished in the journal, so the next `recover` deletes the group.
+
         :param group_id: The identifier of the group to be created.
         :return: `True` if the group creation process completes successfully; `False` otherwise.
         """
 
-        coordinator = SagaCoordinator(self)
-        return await coordinator.execute(group_id)
+        coordinator = SagaCoordinator(
+            self, max_in_flight=self.max_in_flight, timeout=self.saga_timeout, journal=self.journal
+        )
+
+        async def run() -> bool:
+            with self._membership_snapshot() as hosts:
+                return await coordinator.execute(group_id, hosts)
+
+        return await self._coalesce('create', group_id, run)
+
+    async def recover(self) -> Dict[str, List[str]]:
+        """
+        Compensate the `create_group` sagas left unfinished in the journal, e.g. by a crash.
+
+        The group is deleted from every host where it may have been created. Sagas whose compensation succeeds are
+        closed in the journal, and the journal is compacted. Call this on startup, before starting new sagas.
 
-    async def delete_group(self, group_id: str) -> List[str]:
+        :return: A mapping of the saga ID of every unfinished saga to the hosts where its group remains undeleted.
+        """
+
+        if self.journal is None:
+            return {}
+
+        results = {}
+
+        async with self.session() as client:
+            for saga_id, saga in self.journal.unfinished().items():
+                group_id = saga['group_id']
+                logger.warning(f'Recovering unfinished saga {saga_id} of group {group_id}')
+
+                undeleted_hosts = await self.rollback_creation(client, group_id, saga['hosts'])
+                if not undeleted_hosts:
+                    await self.journal.record({'saga': saga_id, 'event': 'end', 'status': 'recovered'})
+                results[saga_id] = undeleted_hosts
+
+        await self.journal.close()
+        self.journal.compact()
+
+        return results
+
+    async def delete_group(
+            self,
+            group_id: str,
+            quorum: Optional[int] = None,
+            on_complete: Optional[Callable[[List[str]], Any]] = None,
+    ) -> List[str]:
         """
         Delete a group from all cluster nodes.
 
+        Deletions run concurrently on all hosts. When `quorum` is given, the method returns as soon as that many
+        hosts have acknowledged the deletion; the remaining deletions keep running in the background and their
+        final outcome is passed to `on_complete`.
+
+        Concurrent full deletions of the same group share one run, and run after any creation of that group in progress.
+
+        :param group_id: The ID of the group to delete.
+        :param quorum: Number of acknowledgements after which to return early. When `None`, waits for all hosts.
+        :param on_complete: Callback receiving the final list of undeleted hosts once every deletion has finished.
+        :return: A list of hosts where the deletion failed, or, after an early return, has not been acknowledged yet.
+        """
+
+        if quorum is None:
+            async def delete() -> List[str]:
+                with self._membership_snapshot() as hosts:
+                    return await self._delete_from_hosts(group_id, hosts)
+
+            with deadline(self.saga_timeout):
+                undeleted_hosts = await self._coalesce('delete', group_id, delete)
+            undeleted_hosts = list(undeleted_hosts)
+            if on_complete is not None:
+                on_complete(undeleted_hosts)
+            return undeleted_hosts
+
+        # The hosts are fixed now, before waiting for the group, and kept from draining until the deletion ends
+        snapshot = ExitStack()
+        hosts = snapshot.enter_context(self._membership_snapshot())
+        if not 0 < quorum <= len(hosts):
+            snapshot.close()
+            raise ValueError(f'quorum must be between 1 and {len(hosts)}')
+
+        acknowledged = []
+        quorum_reached = asyncio.Event()
+
+        def acknowledge(host: str) -> None:
+            acknowledged.append(host)
+            if len(acknowledged) >= quorum:
+                quorum_reached.set()
+
+        with deadline(self.saga_timeout):
+            run = functools.partial(self._delete_from_hosts, group_id, hosts, acknowledge)
+            task = asyncio.create_task(self._serialized(group_id, run))
+        task.add_done_callback(lambda done: snapshot.close())
+        waiter = asyncio.create_task(quorum_reached.wait())
+
+        try:
+            await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            waiter.cancel()
+
+        if task.done():
+            undeleted_hosts = task.result()
+            if on_complete is not None:
+                on_complete(undeleted_hosts)
+            return undeleted_hosts
+
+        logger.info(f'Deletion of group {group_id} acknowledged by {len(acknowledged)} hosts, continuing in background')
+
+        self._background_tasks.add(task)
+        task.add_done_callback(lambda done: self._finish_background_delete(done, group_id, on_complete))
+
+        return [host for host in hosts if host not in acknowledged]
+
+    async def _coalesce(self, operation: str, group_id: str, run: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run an operation on a group, or join the run of the same operation on the same group already in flight.
+
+        The shared run is shielded, so cancelling one caller does not cancel it for the others.
+
+        :param operation: The name of the operation, e.g. `create` or `delete`.
+        :param group_id: The ID of the group the operation applies to.
+        :param run: A callable starting the operation.
+        :return: The result of the shared run.
+        """
+
+        key = (operation, group_id)
+        task = self._inflight.get(key)
+
+        if task is None:
+            task = asyncio.create_task(self._serialized(group_id, run))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget_inflight(key, done))
+        else:
+            logger.info(f'Joining {operation} of group {group_id} already in progress')
+
+        return await asyncio.shield(task)
+
+    def _forget_inflight(self, key: Tuple[str, str], task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _serialized(self, group_id: str, run: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run an operation while holding the lock of its group, so that operations on the same group never overlap.
+        """
+
+        lock, waiters = self._group_locks.get(group_id, (asyncio.Lock(), 0))
+        self._group_locks[group_id] = (lock, waiters + 1)
+
+        try:
+            async with lock:
+                return await run()
+        finally:
+            lock, waiters = self._group_locks[group_id]
+            if waiters == 1:
+                del self._group_locks[group_id]
+            else:
+                self._group_locks[group_id] = (lock, waiters - 1)
+
+    async def _delete_from_hosts(
+            self,
+            group_id: str,
+            hosts: List[str],
+            acknowledge: Optional[Callable[[str], None]] = None,
+    ) -> List[str]:
+        """
+        Delete a group from the given hosts concurrently.
+
         :param group_id: The ID of the group to delete.
+        :param hosts: The membership snapshot of the deletion.
+        :param acknowledge: Called with each host as soon as it confirms the deletion.
         :return: A list of hosts where the deletion failed.
         """
 
-        undeleted_hosts = self.hosts[:]
+        async def delete_on_host(client: httpx.AsyncClient, host: str) -> bool:
+            try:
+                if not await self._delete_group_on_host(client, host, group_id):
+                    logger.warning(f'Deletion failed on host {host}')
+                    return False
+            except Exception as exc:
+                logger.error(f'Error during deletion on host {host}: {exc}')
+                return False
+
+            if acknowledge is not None:
+                acknowledge(host)
+            return True
+
+        saga = self.hooks.saga('delete_group', group_id) if self.hooks is not None else nullcontext({})
+        with saga as outcome:
+            async with self.session() as client:
+                deleted = await asyncio.gather(*(delete_on_host(client, host) for host in hosts))
+            outcome['success'] = all(deleted)
+            return [host for host, ok in zip(hosts, deleted) if not ok]
+
+    def _finish_background_delete(
+            self,
+            task: asyncio.Task,
+            group_id: str,
+            on_complete: Optional[Callable[[List[str]], Any]],
+    ) -> None:
+        self._background_tasks.discard(task)
+
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.error(f'Background deletion of group {group_id} failed: {task.exception()}')
+            return
+
+        undeleted_hosts = task.result()
+        if undeleted_hosts:
+            logger.error(f'Background deletion of group {group_id} failed on hosts: {undeleted_hosts}')
+        if on_complete is not None:
+            on_complete(undeleted_hosts)
+
+    async def verify_group(self, group_id: str) -> List[str]:
+        """
+        Verify that a group exists on all cluster nodes.
+
+        :param group_id: The ID of the group to verify.
+        :return: A list of hosts where the group could not be verified.
+        """
 
-        async with httpx.AsyncClient() as client:
-            for host in self.hosts:
-                try:
-                    if not await self._delete_group_on_host(client, host, group_id):
-                        logger.warning(f'Deletion failed on host {host}')
-                        continue
-                    undeleted_hosts.remove(host)
-                except Exception as exc:
-                    logger.error(f'Error during deletion on host {host}: {exc}')
+        async def verify_on_host(client: httpx.AsyncClient, host: str) -> bool:
+            try:
+                return await self.verify_group_on_host(client, host, group_id)
+            except Exception as exc:
+                logger.error(f'Error during verification on host {host}: {exc}')
+                return False
+
+        with deadline(self.saga_timeout), self._membership_snapshot() as hosts:
+            async with self.session() as client:
+                verified = await asyncio.gather(*(verify_on_host(client, host) for host in hosts))
+
+        return [host for host, ok in zip(hosts, verified) if not ok]
+
+    async def create_groups(
+            self,
+            group_ids: Union[Iterable[str], AsyncIterable[str]],
+            concurrency: int = 100,
+    ) -> AsyncIterator[Tuple[str, bool]]:
+        """
+        Create many groups, running up to `concurrency` sagas at once.
+
+        Group IDs are pulled from `group_ids` lazily, only when a saga slot is free, so the input may be
+        an unbounded iterator. Requests to each host are additionally capped by `max_per_host`. A plain iterable is
+        read inside the event loop and must be cheap to advance; pass slow sources as async iterables.
+
+        :param group_ids: An iterable or async iterable of group IDs to create.
+        :param concurrency: Maximum number of sagas running at the same time.
+        :return: An async iterator of `(group_id, success)` tuples, in completion order.
+        """
+
+        async for result in run_many(self.create_group, group_ids, concurrency):
+            yield result
+
+    async def delete_groups(
+            self,
+            group_ids: Union[Iterable[str], AsyncIterable[str]],
+            concurrency: int = 100,
+    ) -> AsyncIterator[Tuple[str, List[str]]]:
+        """
+        Delete many groups, running up to `concurrency` deletions at once.
+
+        :param group_ids: An iterable or async iterable of group IDs to delete.
+        :param concurrency: Maximum number of deletions running at the same time.
+        :return: An async iterator of `(group_id, undeleted_hosts)` tuples, in completion order.
+        """
+
+        async for result in run_many(self.delete_group, group_ids, concurrency):
+            yield result
+
+
+async def run_many(
+        operation: Callable[[Any], Awaitable[Any]],
+        items: Union[Iterable[Any], AsyncIterable[Any]],
+        concurrency: int,
+) -> AsyncIterator[Tuple[Any, Any]]:
+    """
+    Run `operation` on every item with at most `concurrency` runs at once, e.g. one saga per group ID.
+
+    Items are pulled from `items` lazily, only when a slot is free, so the input may be an unbounded iterator.
+    Results are handed out as soon as each run finishes, also while the next item of an async iterable is awaited.
+    A plain iterable is read inside the event loop, where a slow `next` blocks every run, so it must be cheap, e.g. a
+    list or an in-memory generator. Pass a slow source, such as a pipe or a network stream, as an async iterable.
+
+    :param operation: Coroutine function run on each item.
+    :param items: An iterable or async iterable of items.
+    :param concurrency: Maximum number of runs at the same time.
+    :return: An async iterator of `(item, result)` tuples, in completion order.
+    """
+
+    if concurrency < 1:
+        raise ValueError('concurrency must be a positive integer')
+
+    async def run(item: Any) -> Tuple[Any, Any]:
+        return item, await operation(item)
+
+    pending = set()
+    next_item: Optional[asyncio.Future] = None
+
+    try:
+        if not hasattr(items, '__aiter__'):
+            for item in items:
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+                pending.add(asyncio.create_task(run(item)))
+                # let the new run start, then hand out the runs finished meanwhile
+                await asyncio.sleep(0)
+                for task in [task for task in pending if task.done()]:
+                    pending.discard(task)
+                    yield task.result()
+
+        else:
+            source = items.__aiter__()
+            while True:
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
                     continue
 
-        return undeleted_hosts
+                # race the next item of a slow source against the running ones, so finished ones are
+                # handed out while the source is waited for
+                if next_item is None:
+                    next_item = asyncio.ensure_future(source.__anext__())
+                done, _ = await asyncio.wait(pending | {next_item}, return_when=asyncio.FIRST_COMPLETED)
+                for task in done - {next_item}:
+                    pending.discard(task)
+                    yield task.result()
+                if not next_item.done():
+                    continue
+
+                fetched, next_item = next_item, None
+                try:
+                    item = fetched.result()
+                except StopAsyncIteration:
+                    break
+                pending.add(asyncio.create_task(run(item)))
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+    finally:
+        if next_item is not None:
+            next_item.cancel()
+            pending.add(next_item)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _origin(host: str) -> httpcore.Origin:
+    url = httpx.URL(host)
+    port = url.port or {b'http': 80, b'https': 443}[url.raw_scheme]
+    return httpcore.Origin(url.raw_scheme, url.raw_host, port)
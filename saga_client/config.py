@@ -1,15 +1,16 @@
 import os
 import logging
+from typing import List
 
-logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 
-def get_hosts():
+def get_hosts() -> List[str]:
     hosts_str = os.getenv('HOSTS', '')
     hosts = [host.strip() for host in hosts_str.split(',') if host.strip()]
 
     if not hosts:
-        logging.warning('HOSTS environment variable is not set or is empty. Using default values.')
+        logger.warning('HOSTS environment variable is not set or is empty. Using default values.')
         hosts = [
             'http://localhost:8000',
             'http://localhost:8001',
@@ -18,9 +19,14 @@ def get_hosts():
 
     for host in hosts:
         if not host.startswith('http://') and not host.startswith('https://'):
-            logging.warning(f'URL {host} does not start with http:// or https://')
+            logger.warning('URL %s does not start with http:// or https://', host)
 
     return hosts
 
 
-HOSTS = get_hosts()
+def __getattr__(name: str):
+    # `HOSTS` is read from the environment on first access rather than at import time
+    if name == 'HOSTS':
+        hosts = globals()['HOSTS'] = get_hosts()
+        return hosts
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,16 +1,42 @@
 import httpx
 import logging
+import uuid
+from contextlib import nullcontext
+from typing import List, Optional
 
 from .exceptions import GroupOperationException
+from .retry import deadline, no_deadline
+from .saga import Saga, SagaStep
 
 logger = logging.getLogger(__name__)
 
 
 class SagaCoordinator:
-    def __init__(self, cluster_client):
+    def __init__(
+            self,
+            cluster_client,
+            max_in_flight: Optional[int] = None,
+            timeout: Optional[float] = None,
+            journal=None,
+    ):
+        """
+        :param cluster_client: The `SagaClient` whose hosts and per-host operations are used.
+        :param max_in_flight: Maximum number of concurrent host requests. When `None`, hosts are
+                              processed one after another.
+        :param timeout: Deadline in seconds of the creation and verification steps. The rollback is not bound by it.
+        :param journal: A `SagaJournal` recording the step transitions of the saga, for crash recovery.
+        """
+
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError('max_in_flight must be a positive integer')
+
         self.cluster_client = cluster_client
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.journal = journal
+        self.saga_id = uuid.uuid4().hex
 
-    async def execute(self, group_id: str) -> bool:
+    async def execute(self, group_id: str, hosts: Optional[List[str]] = None) -> bool:
         """
         Execute the group creation process across multiple hosts.
 
@@ -19,34 +45,117 @@ class SagaCoordinator:
         attempts, it verifies the existence of the group on each successful host. If any verification fails, or if any creation attempt
         fails, the method triggers a rollback process on all successfully created hosts.
 
+        The process is the `group_creation_saga`. When `max_in_flight` is set, creations run concurrently and each host is
+        verified as soon as its creation finishes. The first failure cancels the remaining work and moves straight to the
+        rollback, which also covers hosts whose creation was in flight.
+
         :param group_id: The identifier of the group to be created.
+        :param hosts: The hosts to create the group on. Defaults to the current hosts of the cluster client.
         :return: `True` if the group creation and verification are successful on all hosts;
                  `False` if any operation fails and rollback is required.
         """
 
-        success_hosts = []
+        hooks = getattr(self.cluster_client, 'hooks', None)
+        saga = hooks.saga('create_group', group_id, saga_id=self.saga_id) if hooks is not None else nullcontext({})
+
+        with saga as outcome:
+            outcome['success'] = await self._execute(group_id, hosts)
+            return outcome['success']
+
+    def group_creation_saga(self, client: httpx.AsyncClient, group_id: str, hosts: Optional[List[str]] = None) -> Saga:
+        """
+        Build the saga creating a group on every host: a `create` step per host, followed by a `verify` step of that
+        host. Compensation deletes the group from every host whose creation was started, through `rollback_creation`.
+
+        :param client: An instance of `httpx.AsyncClient` for making HTTP requests.
+        :param group_id: The identifier of the group to be created.
+        :param hosts: The hosts to create the group on. Defaults to the current hosts of the cluster client.
+        :return: The saga, ready to run.
+        """
+
+        hosts = list(hosts if hosts is not None else self.cluster_client.hosts)
+
+        def create(host: str):
+            async def action(results):
+                if not await self._create_on_host(client, host, group_id):
+                    raise GroupOperationException(f'Failed to create group on {host}, initiating rollback.')
+            return action
+
+        def verify(host: str):
+            async def action(results):
+                if not await self.cluster_client.verify_group_on_host(client, host, group_id):
+                    raise GroupOperationException(f'Failed to verify group on {host}, initiating rollback.')
+            return action
 
-        async with httpx.AsyncClient() as client:
-            try:
-                for host in self.cluster_client.hosts:
-                    if await self.cluster_client.create_group_on_host(client, host, group_id):
-                        success_hosts.append(host)
-                    else:
-                        raise GroupOperationException(f'Failed to create group on {host}, initiating rollback.')
+        async def compensate(step_names: List[str]) -> List[str]:
+            success_hosts = [name[len('create:'):] for name in step_names if name.startswith('create:')]
+            if not success_hosts:
+                return []
 
-                # Verify creation
-                for host in success_hosts:
-                    if not await self.cluster_client.verify_group_on_host(client, host, group_id):
-                        raise GroupOperationException(f'Failed to verify group on {host}, initiating rollback.')
+            with no_deadline():
+                undeleted_hosts = await self.cluster_client.rollback_creation(client, group_id, success_hosts)
+            if undeleted_hosts:
+                logger.error(f'Rollback failed on the following hosts: {undeleted_hosts}')
+            return [f'create:{host}' for host in undeleted_hosts]
 
-                return True
+        # All creations are declared first, so that a single step in flight creates on every host before verifying
+        steps = [SagaStep(f'create:{host}', create(host)) for host in hosts]
+        steps += [SagaStep(f'verify:{host}', verify(host), depends_on=[f'create:{host}']) for host in hosts]
 
-            except Exception as exc:
-                logger.error(f'Error during group creation. Detail: {exc}')
+        return Saga(steps, compensate=compensate)
 
-                if success_hosts:
-                    undeleted_hosts = await self.cluster_client.rollback_creation(client, group_id, success_hosts)
-                    if undeleted_hosts:
-                        logger.error(f'Rollback failed on the following hosts: {undeleted_hosts}')
+    async def _execute(self, group_id: str, hosts: Optional[List[str]]) -> bool:
+        try:
+            await self._record('begin', group_id=group_id)
+        except OSError as exc:
+            # Without a durable begin record, a crash could leave the group on hosts that recovery does not know of
+            logger.error(f'Failed to journal the saga of group {group_id}, not starting it. Detail: {exc}')
+            return False
+
+        async with self.cluster_client.session() as client:
+            saga = self.group_creation_saga(client, group_id, hosts)
+
+            with deadline(self.timeout):
+                result = await saga.run(max_in_flight=self.max_in_flight or 1)
+
+        if result.success:
+            await self._record_end('completed')
+            return True
+
+        logger.error(f'Error during group creation. Detail: {result.error}')
+
+        if not result.uncompensated:
+            # Sagas with undeleted hosts stay open in the journal, so recovery retries the compensation
+            await self._record_end('rolled_back')
+
+        return False
+
+    async def _record(self, event: str, durable: bool = True, **fields) -> None:
+        if self.journal is not None:
+            await self.journal.record({'saga': self.saga_id, 'event': event, **fields}, durable=durable)
+
+    async def _record_end(self, status: str) -> None:
+        """
+        Record the end of the saga. A failed write is logged, not raised, as the outcome of the saga stands either way.
+        """
+
+        try:
+            await self._record('end', status=status)
+        except OSError as exc:
+            logger.error(
+                f'Failed to journal the end of saga {self.saga_id}, it stays unfinished and the next recovery deletes '
+                f'its group. Detail: {exc}'
+            )
+
+    async def _create_on_host(self, client: httpx.AsyncClient, host: str, group_id: str) -> bool:
+        """
+        Create the group on one host, recording the intent in the journal before the request is sent.
+        """
 
-                return False
+        await self._record('creating', host=host)
+        created = await self.cluster_client.create_group_on_host(client, host, group_id)
+        if created:
+            await self._record('created', durable=False, host=host)
+        else:
+            await self._record('create_failed', host=host)
+        return created
@@ -16,3 +16,36 @@ class RequestErrorException(Exception):
     def __init__(self, host, message):
         self.message = f'Request error on {host}: {message}'
         super().__init__(self.message)
+
+
+class RetryableStatusException(RequestErrorException):
+    """
+    Custom exception for responses whose status code is retried, such as 429 or 503.
+    """
+
+    def __init__(self, host, status_code, retry_after=None):
+        self.status_code = status_code
+        self.retry_after = retry_after
+        super().__init__(host, f'status {status_code}')
+
+
+class CircuitOpenException(Exception):
+    """
+    Custom exception raised when a host is skipped because its circuit breaker is open.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.message = f'Circuit open for {host}, request not sent'
+        super().__init__(self.message)
+
+
+class DeadlineExceededException(Exception):
+    """
+    Custom exception raised when a request cannot be sent because the saga deadline has passed.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.message = f'Saga deadline exceeded before request to {host}'
+        super().__init__(self.message)
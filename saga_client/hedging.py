@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class HedgePolicy:
+    """
+    Settings and per-host latency tracking for hedged verification requests.
+
+    A hedged request sends a second, identical request when the first one has not answered within a delay. The first
+    response wins and the other request is cancelled. The delay is either fixed or a rolling latency percentile of the
+    host, and `budget` caps the hedged requests to a fraction of all requests.
+    """
+
+    def __init__(
+            self,
+            delay: Optional[float] = None,
+            percentile: Optional[float] = None,
+            window: int = 100,
+            min_samples: int = 20,
+            budget: float = 0.05,
+    ):
+        """
+        :param delay: Fixed delay in seconds before hedging. Also used while a host has fewer than `min_samples`
+                      latency samples when `percentile` is set.
+        :param percentile: Hedge when a request is slower than this percentile (0 to 1) of the host's recent latencies.
+        :param window: Number of recent latencies kept per host.
+        :param min_samples: Number of samples needed before the percentile is used.
+        :param budget: Maximum ratio of hedged requests to requests.
+        """
+
+        if delay is None and percentile is None:
+            raise ValueError('Either delay or percentile must be set')
+        if percentile is not None and not 0 < percentile < 1:
+            raise ValueError('percentile must be between 0 and 1')
+
+        self.delay = delay
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = min_samples
+        self.budget = budget
+        self.requests = 0
+        self.hedges = 0
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def hedge_delay(self, host: str) -> Optional[float]:
+        """
+        :return: Seconds to wait before hedging a request to `host`, or `None` if it should not be hedged.
+        """
+
+        if self.percentile is not None:
+            latencies = self._latencies.get(host)
+            if latencies is not None and len(latencies) >= self.min_samples:
+                ordered = sorted(latencies)
+                return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+        return self.delay
+
+    def allow_hedge(self) -> bool:
+        if self.hedges + 1 > self.budget * self.requests:
+            return False
+        self.hedges += 1
+        return True
+
+    def record(self, host: str, latency: float) -> None:
+        latencies = self._latencies.get(host)
+        if latencies is None:
+            latencies = self._latencies[host] = deque(maxlen=self.window)
+        latencies.append(latency)
+
+    async def send(
+            self,
+            host: str,
+            send: Callable[[], Awaitable[httpx.Response]],
+            can_hedge: Optional[Callable[[], bool]] = None,
+    ) -> httpx.Response:
+        """
+        Send a request, hedging it with a second one if it is slower than the hedge delay of the host.
+
+        :param host: The host URL the request is sent to.
+        :param send: A callable that performs the request. It is called twice when the request is hedged.
+        :param can_hedge: Called when the hedge delay has passed. The request is only hedged if it returns `True`,
+                          e.g. when the host has a free request slot. When `None`, the budget alone decides.
+        :return: The first successful response.
+        """
+
+        self.requests += 1
+        started_at = time.monotonic()
+        pending = {asyncio.ensure_future(send())}
+
+        try:
+            delay = self.hedge_delay(host)
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and (can_hedge is None or can_hedge()) and self.allow_hedge():
+                    logger.info('Hedging request to %s after %.3fs', host, delay)
+                    pending.add(asyncio.ensure_future(send()))
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = None
+                for task in done:
+                    # retrieve the exception of every finished request, also when another one wins
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+                if winner is not None:
+                    self.record(host, time.monotonic() - started_at)
+                    return winner.result()
+
+            raise error
+
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
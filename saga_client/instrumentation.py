@@ -0,0 +1,320 @@
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_current_saga: ContextVar[Optional[str]] = ContextVar('saga_id', default=None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def current_saga_id() -> Optional[str]:
+    """
+    :return: The ID of the saga the current task belongs to, or `None` outside of an instrumented saga.
+    """
+
+    return _current_saga.get()
+
+
+class Hooks:
+    """
+    Registry of callbacks for the instrumentation events of a `SagaClient`.
+
+    Callbacks receive the event fields as keyword arguments:
+
+    - `saga_start`: `saga_id`, `operation`, `group_id`
+    - `saga_end`: `saga_id`, `operation`, `group_id`, `success`, `started_at`, `duration`
+    - `step_start`: `saga_id`, `host`, `step`
+    - `step_end`: `saga_id`, `host`, `step`, `status_code`, `error`, `started_at`, `duration`
+    - `retry`: `saga_id`, `host`, `reason`, `attempt`, `sleep`
+    - `rollback`: `saga_id`, `group_id`, `hosts`, `undeleted_hosts`
+    - `circuit_state`: `host`, `old_state`, `new_state`
+
+    `started_at` is a Unix timestamp and `duration` is in seconds. Exceptions raised by callbacks are logged and
+    never interrupt a saga.
+    """
+
+    EVENTS = ('saga_start', 'saga_end', 'step_start', 'step_end', 'retry', 'rollback', 'circuit_state')
+
+    def __init__(self):
+        self._callbacks: Dict[str, List[Callable[..., Any]]] = {event: [] for event in self.EVENTS}
+
+    def on(self, event: str, callback: Callable[..., Any]) -> Callable[..., Any]:
+        if event not in self._callbacks:
+            raise ValueError(f'Unknown event {event}')
+        self._callbacks[event].append(callback)
+        return callback
+
+    def emit(self, event: str, **fields) -> None:
+        for callback in self._callbacks[event]:
+            try:
+                callback(**fields)
+            except Exception as exc:
+                logger.error(f'Instrumentation callback for {event} failed: {exc}')
+
+    @contextmanager
+    def saga(self, operation: str, group_id: str, saga_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Emit `saga_start` and `saga_end` around a saga, and make its ID available to the steps run inside it.
+
+        :return: A dictionary in which the caller sets `success` before leaving the block.
+        """
+
+        saga_id = saga_id or os.urandom(8).hex()
+        outcome = {'success': False}
+        started_at = time.time()
+        started = time.perf_counter()
+
+        token = _current_saga.set(saga_id)
+        self.emit('saga_start', saga_id=saga_id, operation=operation, group_id=group_id)
+        try:
+            yield outcome
+        finally:
+            _current_saga.reset(token)
+            self.emit(
+                'saga_end',
+                saga_id=saga_id,
+                operation=operation,
+                group_id=group_id,
+                success=outcome['success'],
+                started_at=started_at,
+                duration=time.perf_counter() - started,
+            )
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket upper bounds, as used by Prometheus.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsCollector:
+    """
+    Collects per-host request latency histograms and counters from `Hooks` and exports them in Prometheus text format.
+    """
+
+    def __init__(self, hooks: Hooks, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.request_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.requests: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self.retries: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.saga_latency: Dict[str, Histogram] = {}
+        self.sagas: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.rollbacks: Dict[str, int] = defaultdict(int)
+        self.circuit_transitions: Dict[Tuple[str, str], int] = defaultdict(int)
+
+        hooks.on('step_end', self._on_step_end)
+        hooks.on('retry', self._on_retry)
+        hooks.on('saga_end', self._on_saga_end)
+        hooks.on('rollback', self._on_rollback)
+        hooks.on('circuit_state', self._on_circuit_state)
+
+    def _on_step_end(self, host: str, step: str, status_code: Optional[int], error: Optional[str], duration: float,
+                     **fields) -> None:
+        histogram = self.request_latency.get((host, step))
+        if histogram is None:
+            histogram = self.request_latency[(host, step)] = Histogram(self.buckets)
+        histogram.observe(duration)
+        self.requests[(host, step, str(status_code) if status_code is not None else error or 'error')] += 1
+
+    def _on_retry(self, host: str, reason: str, **fields) -> None:
+        self.retries[(host, reason)] += 1
+
+    def _on_saga_end(self, operation: str, success: bool, duration: float, **fields) -> None:
+        histogram = self.saga_latency.get(operation)
+        if histogram is None:
+            histogram = self.saga_latency[operation] = Histogram(self.buckets)
+        histogram.observe(duration)
+        self.sagas[(operation, 'success' if success else 'failure')] += 1
+
+    def _on_rollback(self, undeleted_hosts: List[str], **fields) -> None:
+        self.rollbacks['failure' if undeleted_hosts else 'success'] += 1
+
+    def _on_circuit_state(self, host: str, new_state: str, **fields) -> None:
+        self.circuit_transitions[(host, new_state)] += 1
+
+    def merge(self, other: 'MetricsCollector') -> None:
+        """
+        Add the metrics of `other`, e.g. collected in another process, to this collector.
+        """
+
+        for target, source in ((self.request_latency, other.request_latency), (self.saga_latency, other.saga_latency)):
+            for key, histogram in source.items():
+                merged = target.get(key)
+                if merged is None:
+                    merged = target[key] = Histogram(histogram.buckets)
+                merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                merged.sum += histogram.sum
+                merged.count += histogram.count
+
+        counters = (
+            (self.requests, other.requests),
+            (self.retries, other.retries),
+            (self.sagas, other.sagas),
+            (self.rollbacks, other.rollbacks),
+            (self.circuit_transitions, other.circuit_transitions),
+        )
+        for target, source in counters:
+            for key, value in source.items():
+                target[key] += value
+
+    def prometheus(self) -> str:
+        """
+        :return: All metrics in the Prometheus text exposition format.
+        """
+
+        lines = []
+
+        lines.append('# HELP saga_request_duration_seconds Latency of requests to group service hosts.')
+        lines.append('# TYPE saga_request_duration_seconds histogram')
+        for (host, step), histogram in sorted(self.request_latency.items()):
+            lines.extend(_histogram_lines('saga_request_duration_seconds', histogram, host=host, step=step))
+
+        lines.append('# HELP saga_requests_total Requests to group service hosts by outcome.')
+        lines.append('# TYPE saga_requests_total counter')
+        for (host, step, outcome), value in sorted(self.requests.items()):
+            lines.append(f'saga_requests_total{_labels(host=host, step=step, outcome=outcome)} {value}')
+
+        lines.append('# HELP saga_retries_total Retried requests by reason.')
+        lines.append('# TYPE saga_retries_total counter')
+        for (host, reason), value in sorted(self.retries.items()):
+            lines.append(f'saga_retries_total{_labels(host=host, reason=reason)} {value}')
+
+        lines.append('# HELP saga_duration_seconds Duration of sagas.')
+        lines.append('# TYPE saga_duration_seconds histogram')
+        for operation, histogram in sorted(self.saga_latency.items()):
+            lines.extend(_histogram_lines('saga_duration_seconds', histogram, operation=operation))
+
+        lines.append('# HELP saga_total Sagas by outcome.')
+        lines.append('# TYPE saga_total counter')
+        for (operation, outcome), value in sorted(self.sagas.items()):
+            lines.append(f'saga_total{_labels(operation=operation, outcome=outcome)} {value}')
+
+        lines.append('# HELP saga_rollbacks_total Rollbacks by outcome.')
+        lines.append('# TYPE saga_rollbacks_total counter')
+        for outcome, value in sorted(self.rollbacks.items()):
+            lines.append(f'saga_rollbacks_total{_labels(outcome=outcome)} {value}')
+
+        lines.append('# HELP saga_circuit_transitions_total Circuit breaker state changes.')
+        lines.append('# TYPE saga_circuit_transitions_total counter')
+        for (host, state), value in sorted(self.circuit_transitions.items()):
+            lines.append(f'saga_circuit_transitions_total{_labels(host=host, state=state)} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class SpanRecorder:
+    """
+    Records sagas and their host requests as OpenTelemetry-style spans.
+
+    Spans are dictionaries with the fields of the OpenTelemetry data model (`trace_id`, `span_id`, `parent_span_id`,
+    `name`, `start_time_unix_nano`, `end_time_unix_nano`, `attributes`, `status`). Every saga is one trace, and its
+    host requests are child spans of the saga span.
+    """
+
+    def __init__(self, hooks: Hooks, max_spans: int = 10000):
+        """
+        :param hooks: The hooks to record spans from.
+        :param max_spans: Maximum number of spans kept until `export` is called; the oldest ones are dropped.
+        """
+
+        self.spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+        hooks.on('saga_end', self._on_saga_end)
+        hooks.on('step_end', self._on_step_end)
+
+    def export(self) -> List[Dict[str, Any]]:
+        """
+        :return: The recorded spans, which are removed from the recorder.
+        """
+
+        spans = list(self.spans)
+        self.spans.clear()
+        return spans
+
+    def _on_saga_end(self, saga_id: str, operation: str, group_id: str, success: bool, started_at: float,
+                     duration: float, **fields) -> None:
+        self.spans.append(_span(
+            trace_id=_trace_id(saga_id),
+            span_id=saga_id[:16],
+            parent_span_id=None,
+            name=f'saga.{operation}',
+            started_at=started_at,
+            duration=duration,
+            attributes={'saga.operation': operation, 'saga.group_id': group_id},
+            ok=success,
+        ))
+
+    def _on_step_end(self, saga_id: Optional[str], host: str, step: str, status_code: Optional[int],
+                     error: Optional[str], started_at: float, duration: float, **fields) -> None:
+        attributes = {'server.address': host, 'saga.step': step}
+        if status_code is not None:
+            attributes['http.response.status_code'] = status_code
+        if error is not None:
+            attributes['error.type'] = error
+
+        self.spans.append(_span(
+            trace_id=_trace_id(saga_id) if saga_id else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_span_id=saga_id[:16] if saga_id else None,
+            name=f'saga.step.{step}',
+            started_at=started_at,
+            duration=duration,
+            attributes=attributes,
+            ok=error is None and (status_code is None or status_code < 400),
+        ))
+
+
+def _trace_id(saga_id: str) -> str:
+    return saga_id.ljust(32, '0')[:32]
+
+
+def _span(trace_id: str, span_id: str, parent_span_id: Optional[str], name: str, started_at: float,
+          duration: float, attributes: Dict[str, Any], ok: bool) -> Dict[str, Any]:
+    start = int(started_at * 1e9)
+    return {
+        'trace_id': trace_id,
+        'span_id': span_id,
+        'parent_span_id': parent_span_id,
+        'name': name,
+        'start_time_unix_nano': start,
+        'end_time_unix_nano': start + int(duration * 1e9),
+        'attributes': attributes,
+        'status': {'code': 'OK' if ok else 'ERROR'},
+    }
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels: Any) -> str:
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram_lines(name: str, histogram: Histogram, **labels: str) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{_labels(**labels, le=repr(bound))} {cumulative}')
+    lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {histogram.count}')
+    lines.append(f'{name}_sum{_labels(**labels)} {histogram.sum}')
+    lines.append(f'{name}_count{_labels(**labels)} {histogram.count}')
+    return lines
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SagaJournal:
+    """
+    Append-only, file-based journal of saga step transitions, used to compensate unfinished sagas after a crash.
+
+    Every record is one JSON line. Records written while a previous batch is being synced are grouped and written
+    with a single `fsync` (group commit), so concurrent sagas share the cost of durability.
+    """
+
+    def __init__(self, path: str, commit_delay: float = 0.0):
+        """
+        :param path: Path of the journal file. It is created if it does not exist.
+        :param commit_delay: Seconds to wait for more records before each write, trading latency for larger batches.
+        """
+
+        self.path = path
+        self.commit_delay = commit_delay
+        self._file = None
+        self._buffer: List[str] = []
+        self._waiters: List[asyncio.Future] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def record(self, entry: Dict[str, Any], durable: bool = True) -> None:
+        """
+        Append a record to the journal.
+
+        :param entry: The record to append. Must be JSON serializable.
+        :param durable: Wait until the record is synced to disk. When `False`, the record is written with the next batch.
+        """
+
+        loop = asyncio.get_running_loop()
+        self._buffer.append(json.dumps(entry))
+
+        waiter = None
+        if durable:
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._flush())
+
+        if waiter is not None:
+            await waiter
+
+    async def close(self) -> None:
+        """
+        Write the pending records and close the journal file.
+        """
+
+        if self._flusher is not None:
+            await self._flusher
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def _flush(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while self._buffer:
+            if self.commit_delay:
+                await asyncio.sleep(self.commit_delay)
+
+            lines, self._buffer = self._buffer, []
+            waiters, self._waiters = self._waiters, []
+
+            try:
+                await loop.run_in_executor(None, self._write, lines)
+            except Exception as exc:
+                logger.error(f'Failed to write saga journal {self.path}: {exc}')
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(exc)
+                continue
+
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    def _write(self, lines: List[str]) -> None:
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+        self._file.write('\n'.join(lines) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def unfinished(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Scan the journal for sagas that have started but not ended.
+
+        :return: A mapping of saga ID to a dictionary with the `group_id` of the saga and the `hosts` where the group
+                 may have been created.
+        """
+
+        sagas: Dict[str, Dict[str, Any]] = {}
+
+        if not os.path.exists(self.path):
+            return sagas
+
+        with open(self.path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn write at the end of the journal
+                    continue
+
+                saga_id = entry.get('saga')
+                event = entry.get('event')
+
+                if event == 'begin':
+                    sagas[saga_id] = {'group_id': entry['group_id'], 'hosts': []}
+                elif saga_id not in sagas:
+                    continue
+                elif event == 'creating':
+                    sagas[saga_id]['hosts'].append(entry['host'])
+                elif event == 'create_failed' and entry['host'] in sagas[saga_id]['hosts']:
+                    sagas[saga_id]['hosts'].remove(entry['host'])
+                elif event == 'end':
+                    del sagas[saga_id]
+
+        return sagas
+
+    def compact(self) -> None:
+        """
+        Rewrite the journal so that it only holds the sagas that are still unfinished.
+
+        Must not be called while sagas are writing to the journal.
+        """
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        sagas = self.unfinished()
+        temporary_path = f'{self.path}.tmp'
+
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            for saga_id, saga in sagas.items():
+                file.write(json.dumps({'saga': saga_id, 'event': 'begin', 'group_id': saga['group_id']}) + '\n')
+                for host in saga['hosts']:
+                    file.write(json.dumps({'saga': saga_id, 'event': 'creating', 'host': host}) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HostLimiter:
+    """
+    Adaptive concurrency limit (AIMD) with an optional token-bucket rate cap for a single host.
+
+    The limit grows by about one request per round-trip while latency stays close to its baseline, and shrinks
+    multiplicatively on timeouts, overload responses or latency spikes. Requests above the limit wait in FIFO order.
+    """
+
+    def __init__(self, host: str, policy: 'AdaptiveLimit'):
+        self.host = host
+        self.policy = policy
+        self.limit = float(policy.initial_limit)
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self._tokens = float(policy.burst) if policy.rate is not None else 0.0
+        self._tokens_at = time.monotonic()
+
+    def available(self) -> bool:
+        """
+        :return: Whether a request slot is free, so that `acquire` does not wait for one.
+        """
+
+        return self.in_flight < int(self.limit) and not self._waiters
+
+    async def acquire(self) -> None:
+        """
+        Wait for a free request slot and, when a rate is set, for a token.
+        """
+
+        if self.available():
+            self.in_flight += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just before the cancellation
+                    self.in_flight -= 1
+                    self._wake()
+                else:
+                    self._waiters.remove(waiter)
+                raise
+
+        if self.policy.rate is not None:
+            delay = self._reserve_token()
+            if delay > 0:
+                try:
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    self.in_flight -= 1
+                    self._wake()
+                    raise
+
+    def release(self, latency: Optional[float], overloaded: bool) -> None:
+        """
+        Return a request slot and adapt the limit to the outcome of the request.
+
+        :param latency: Duration of the request in seconds, or `None` if the request failed for another reason than
+                        overload, in which case the limit is left unchanged.
+        :param overloaded: Whether the request timed out or the host answered that it is overloaded.
+        """
+
+        self.in_flight -= 1
+        policy = self.policy
+
+        if latency is None:
+            self._wake()
+            return
+
+        if overloaded or (self.baseline is not None and latency > self.baseline * policy.latency_tolerance):
+            self._decrease()
+        else:
+            self.limit = min(policy.max_limit, self.limit + policy.increase / self.limit)
+
+        if not overloaded:
+            if self.baseline is None:
+                self.baseline = latency
+            else:
+                self.baseline += policy.smoothing * (latency - self.baseline)
+
+        self._wake()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        # Only shrink once per round-trip, so that a burst of failures of the same window counts once
+        if now - self._last_decrease < (self.baseline or 0):
+            return
+
+        self._last_decrease = now
+        old_limit = self.limit
+        self.limit = max(self.policy.min_limit, self.limit * self.policy.decrease_factor)
+        logger.info('Concurrency limit of %s decreased from %.1f to %.1f', self.host, old_limit, self.limit)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _reserve_token(self) -> float:
+        """
+        Take a token from the bucket, going into debt if it is empty.
+
+        :return: Seconds to wait until the reserved token is available.
+        """
+
+        now = time.monotonic()
+        rate = self.policy.rate
+        self._tokens = min(float(self.policy.burst), self._tokens + (now - self._tokens_at) * rate)
+        self._tokens_at = now
+        self._tokens -= 1
+
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / rate
+
+
+class AdaptiveLimit:
+    """
+    Settings of the adaptive per-host concurrency limits of a `SagaClient`, and the limiter of each host.
+    """
+
+    def __init__(
+            self,
+            initial_limit: int = 4,
+            min_limit: int = 1,
+            max_limit: int = 200,
+            increase: float = 1.0,
+            decrease_factor: float = 0.5,
+            latency_tolerance: float = 2.0,
+            smoothing: float = 0.1,
+            rate: Optional[float] = None,
+            burst: Optional[int] = None,
+    ):
+        """
+        :param initial_limit: Concurrency limit of a host before any request completed.
+        :param min_limit: Lower bound of the concurrency limit.
+        :param max_limit: Upper bound of the concurrency limit.
+        :param increase: Additive increase of the limit per round-trip without congestion.
+        :param decrease_factor: Factor applied to the limit on congestion.
+        :param latency_tolerance: A request slower than this multiple of the baseline latency counts as congestion.
+        :param smoothing: Weight of the newest sample in the exponentially weighted baseline latency.
+        :param rate: Maximum requests per second per host. When `None`, requests are not rate limited.
+        :param burst: Size of the token bucket. Defaults to one second worth of `rate`.
+        """
+
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError('Limits must satisfy 1 <= min_limit <= initial_limit <= max_limit')
+        if not 0 < decrease_factor < 1:
+            raise ValueError('decrease_factor must be between 0 and 1')
+
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate or 1))
+        self.limiters: Dict[str, HostLimiter] = {}
+
+    def limiter(self, host: str) -> HostLimiter:
+        limiter = self.limiters.get(host)
+        if limiter is None:
+            limiter = self.limiters[host] = HostLimiter(host, self)
+        return limiter
@@ -0,0 +1,90 @@
+"""
+Host providers updating the membership of a `SagaClient` at runtime.
+"""
+import asyncio
+import inspect
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class HostProvider(ABC):
+    """
+    Source of the cluster membership. `watch` yields the list of host URLs whenever it changes.
+    """
+
+    @abstractmethod
+    def watch(self) -> AsyncIterator[List[str]]:
+        """
+        :return: An async iterator of the list of host URLs, yielding a new list on every membership change.
+        """
+
+
+class PollingHostProvider(HostProvider):
+    """
+    Polls a callable, e.g. a service discovery lookup, for the list of hosts.
+
+    Errors and empty lists are logged and skipped, so a failed lookup never removes every host.
+    """
+
+    def __init__(self, fetch: Callable[[], Union[List[str], Awaitable[List[str]]]], interval: float = 5.0):
+        """
+        :param fetch: Function or coroutine function returning the current list of host URLs.
+        :param interval: Seconds between two polls.
+        """
+
+        self.fetch = fetch
+        self.interval = interval
+
+    async def watch(self) -> AsyncIterator[List[str]]:
+        last_hosts: Optional[List[str]] = None
+
+        while True:
+            try:
+                hosts = self.fetch()
+                if inspect.isawaitable(hosts):
+                    hosts = await hosts
+            except Exception as exc:
+                logger.error(f'Failed to fetch the cluster hosts. Detail: {exc}')
+                hosts = None
+
+            if not hosts:
+                if hosts is not None:
+                    logger.error('Host provider returned no hosts, keeping the current ones')
+            elif hosts != last_hosts:
+                last_hosts = list(hosts)
+                yield list(hosts)
+
+            await asyncio.sleep(self.interval)
+
+
+class FileHostProvider(PollingHostProvider):
+    """
+    Watches a file listing the host URLs, separated by commas or newlines. Lines starting with `#` are ignored.
+
+    The file is read again whenever its modification time changes. Replace it atomically, e.g. with a rename, so
+    that a half-written file is never read.
+    """
+
+    def __init__(self, path: str, interval: float = 1.0):
+        """
+        :param path: Path of the host file.
+        :param interval: Seconds between two checks of the file's modification time.
+        """
+
+        super().__init__(self._read, interval)
+        self.path = path
+        self._mtime: Optional[int] = None
+        self._hosts: List[str] = []
+
+    def _read(self) -> List[str]:
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            with open(self.path, encoding='utf-8') as file:
+                lines = [line.strip() for line in file if not line.strip().startswith('#')]
+            self._hosts = [host.strip() for line in lines for host in line.split(',') if host.strip()]
+            self._mtime = mtime
+        return self._hosts
@@ -0,0 +1,315 @@
+import asyncio
+import functools
+import logging
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Iterable, Iterator, Optional, TypeVar
+
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    RetryError,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+    wait_random_exponential,
+)
+
+from .exceptions import DeadlineExceededException, RequestErrorException, RetryableStatusException
+from .instrumentation import current_saga_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+T = TypeVar('T')
+
+_deadline: ContextVar[Optional[float]] = ContextVar('saga_deadline', default=None)
+
+
+@contextmanager
+def deadline(timeout: Optional[float]) -> Iterator[None]:
+    """
+    Bound every request and retry made inside the block to `timeout` seconds from now.
+
+    The deadline is stored in a context variable, so it is seen by tasks started inside the block as well.
+    Nested deadlines can only shorten the enclosing one. A `timeout` of `None` leaves the current deadline as is.
+    """
+
+    if timeout is None:
+        yield
+        return
+
+    expires_at = time.monotonic() + timeout
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def no_deadline() -> Iterator[None]:
+    """
+    Lift the current deadline inside the block, e.g. for compensations that must run even after the deadline.
+    """
+
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """
+    :return: Seconds left until the current deadline, or `None` if no deadline is set.
+    """
+
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+def check_deadline(host: str) -> None:
+    """
+    :param host: The host the request is sent to, used in the error message.
+    :raises DeadlineExceededException: If the current deadline has already passed.
+    """
+
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceededException(host)
+
+
+async def wait_before_deadline(awaitable: Awaitable[T], host: str) -> T:
+    """
+    Wait for `awaitable`, e.g. a free request slot, for no longer than the time left until the current deadline.
+
+    :param host: The host the request is sent to, used in the error message.
+    :raises DeadlineExceededException: If the deadline passes first, in which case `awaitable` is cancelled.
+    """
+
+    remaining = remaining_time()
+    if remaining is None:
+        return await awaitable
+
+    try:
+        return await asyncio.wait_for(awaitable, max(remaining, 0))
+    except asyncio.TimeoutError:
+        raise DeadlineExceededException(host)
+
+
+def stop_before_deadline(retry_state: RetryCallState) -> bool:
+    """
+    Tenacity stop condition that gives up when the next attempt would start after the current deadline.
+    """
+
+    remaining = remaining_time()
+    if remaining is None:
+        return False
+    return remaining <= (retry_state.upcoming_sleep or 0)
+
+
+class RetryPolicy:
+    """
+    Retry and timeout settings shared by the per-host requests of a `SagaClient`.
+    """
+
+    def __init__(
+            self,
+            attempts: int = 3,
+            multiplier: float = 1,
+            min_wait: float = 1,
+            max_wait: float = 10,
+            jitter: bool = True,
+            request_timeout: float = 10,
+            retry_statuses: Iterable[int] = DEFAULT_RETRY_STATUSES,
+            max_retry_after: float = 60,
+    ):
+        """
+        :param attempts: Maximum number of attempts per request, including the first one.
+        :param multiplier: Multiplier of the exponential backoff.
+        :param min_wait: Minimum wait between attempts when `jitter` is disabled.
+        :param max_wait: Maximum wait between attempts.
+        :param jitter: Use full jitter, i.e. a random wait between 0 and the exponential backoff, so that concurrent
+                       sagas do not retry in lock-step.
+        :param request_timeout: Timeout in seconds of a single request. Cut down to the remaining saga deadline.
+        :param retry_statuses: Response status codes that are retried like request errors. Other statuses fail fast.
+        :param max_retry_after: Upper bound in seconds on the wait requested by a `Retry-After` header.
+        """
+
+        if attempts < 1:
+            raise ValueError('attempts must be a positive integer')
+
+        self.attempts = attempts
+        self.multiplier = multiplier
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.jitter = jitter
+        self.request_timeout = request_timeout
+        self.retry_statuses = frozenset(retry_statuses)
+        self.max_retry_after = max_retry_after
+        self.stats: Counter = Counter()
+
+        # Built once, as they are the same for every call; the state of each call lives in its RetryCallState
+        self._retry = retry_if_exception_type(RequestErrorException)
+        self._stop = stop_after_attempt(self.attempts) | stop_before_deadline
+        if self.jitter:
+            self._backoff = wait_random_exponential(multiplier=self.multiplier, max=self.max_wait)
+        else:
+            self._backoff = wait_exponential(multiplier=self.multiplier, min=self.min_wait, max=self.max_wait)
+
+    def retrying(self, on_retry: Optional[Callable[[str, int, float], None]] = None) -> AsyncRetrying:
+        """
+        :param on_retry: Called with the reason, the attempt number and the wait before each retry.
+        :return: A tenacity retrying object following the policy, e.g. for calls outside `SagaClient`.
+        """
+
+        return AsyncRetrying(
+            retry=self._retry,
+            stop=self._stop,
+            wait=self._wait,
+            before_sleep=functools.partial(self._before_sleep, on_retry),
+        )
+
+    def next_wait(self, retry_state: RetryCallState) -> Optional[float]:
+        """
+        :param retry_state: The state of a call whose last attempt failed with a `RequestErrorException`.
+        :return: Seconds to wait before the next attempt, or `None` if the call has to give up.
+        """
+
+        retry_state.upcoming_sleep = self._wait(retry_state)
+        if self._stop(retry_state):
+            return None
+        return retry_state.upcoming_sleep
+
+    def check_response(self, host: str, response: httpx.Response) -> None:
+        """
+        :raises RetryableStatusException: If the status code of the response is one of `retry_statuses`.
+        """
+
+        if response.status_code in self.retry_statuses:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            raise RetryableStatusException(host, response.status_code, retry_after)
+
+    def _wait(self, retry_state: RetryCallState) -> float:
+        exc = retry_state.outcome.exception()
+        if isinstance(exc, RetryableStatusException) and exc.retry_after is not None:
+            return min(exc.retry_after, self.max_retry_after)
+        return self._backoff(retry_state)
+
+    def _before_sleep(self, on_retry: Optional[Callable[[str, int, float], None]], retry_state: RetryCallState) -> None:
+        reason = _retry_reason(retry_state.outcome.exception())
+        self.stats[f'retry:{reason}'] += 1
+        logger.warning(
+            'Retrying after %s in %.2fs (attempt %d)', reason, retry_state.upcoming_sleep, retry_state.attempt_number
+        )
+        if on_retry is not None:
+            on_retry(reason, retry_state.attempt_number, retry_state.upcoming_sleep)
+
+    def timeout(self, host: str) -> float:
+        """
+        :param host: The host the request is sent to, used in the error message.
+        :return: The timeout of the next request, cut down to the remaining saga deadline.
+        :raises DeadlineExceededException: If the saga deadline has already passed.
+        """
+
+        remaining = remaining_time()
+        if remaining is None:
+            return self.request_timeout
+        if remaining <= 0:
+            raise DeadlineExceededException(host)
+        return min(self.request_timeout, remaining)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    :param value: The value of a `Retry-After` header, in seconds or as an HTTP date.
+    :return: The number of seconds to wait, or `None` if the header is missing or invalid.
+    """
+
+    if not isinstance(value, str):
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _retry_reason(exc: BaseException) -> str:
+    if isinstance(exc, RetryableStatusException):
+        return str(exc.status_code)
+    return type(exc).__name__
+
+
+def _emit_retry(hooks, host: str, reason: str, attempt: int, sleep: float) -> None:
+    hooks.emit('retry', saga_id=current_saga_id(), host=host, reason=reason, attempt=attempt, sleep=sleep)
+
+
+def retry_with_policy(func):
+    """
+    Retry a `SagaClient` method according to the client's `retry_policy`.
+
+    When the retries are exhausted on a retried status code, the method returns `False` like for any other
+    unsuccessful status. Exhausted request errors raise `tenacity.RetryError`.
+
+    The retry loop is run here rather than by a `tenacity.AsyncRetrying` built for every call, and the state of the
+    retries is only created once an attempt has failed, so a call succeeding at once costs little more than the
+    method itself.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        policy = self.retry_policy
+        retry_state = None
+
+        while True:
+            try:
+                result = await func(self, *args, **kwargs)
+            except RequestErrorException:
+                if retry_state is None:
+                    retry_state = RetryCallState(None, func, args, kwargs)
+                retry_state.set_exception(sys.exc_info())
+            else:
+                if retry_state is not None:
+                    policy.stats['recovered'] += 1
+                return result
+
+            sleep = policy.next_wait(retry_state)
+            if sleep is None:
+                policy.stats['exhausted'] += 1
+                exc = retry_state.outcome.exception()
+                if isinstance(exc, RetryableStatusException):
+                    return False
+                raise RetryError(retry_state.outcome) from exc
+
+            on_retry = None
+            if self.hooks is not None:
+                host = args[1] if len(args) > 1 else kwargs.get('host')
+                on_retry = functools.partial(_emit_retry, self.hooks, host)
+            policy._before_sleep(on_retry, retry_state)
+            await asyncio.sleep(sleep)
+            retry_state.prepare_for_next_attempt()
+
+    return wrapper
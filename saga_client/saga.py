@@ -0,0 +1,222 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+Action = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class SagaStep:
+    """
+    One step of a saga: an action, the compensation that undoes it, and the steps it depends on.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            action: Action,
+            compensation: Optional[Action] = None,
+            depends_on: Sequence[str] = (),
+    ):
+        """
+        :param name: Unique name of the step within its saga.
+        :param action: Coroutine function performing the step. It receives the results of the steps completed so
+                       far, keyed by step name, and fails by raising an exception.
+        :param compensation: Coroutine function undoing the step, called with the same results mapping. It must be
+                             safe to call even if the action was cancelled before completing.
+        :param depends_on: Names of the steps that must complete before this one starts.
+        """
+
+        self.name = name
+        self.action = action
+        self.compensation = compensation
+        self.depends_on = tuple(depends_on)
+
+
+class SagaResult:
+    """
+    Outcome of a saga run.
+    """
+
+    def __init__(self):
+        self.success = False
+        self.results: Dict[str, Any] = {}
+        self.failed_step: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.compensated: List[str] = []
+        self.uncompensated: List[str] = []
+
+
+class Saga:
+    """
+    A set of steps forming a directed acyclic graph, executed with as much parallelism as the dependencies allow.
+
+    When a step fails, the running steps are cancelled and every started step is compensated in reverse topological
+    order: a step is compensated only after all the steps depending on it are, and independent compensations run
+    concurrently.
+    """
+
+    def __init__(
+            self,
+            steps: Sequence[SagaStep],
+            compensate: Optional[Callable[[List[str]], Awaitable[List[str]]]] = None,
+    ):
+        """
+        :param steps: The steps of the saga. Steps that become ready at the same time start in this order.
+        :param compensate: Optional coroutine function replacing the per-step compensations, e.g. for a bulk
+                           compensation. It receives the names of the steps to compensate and returns those that
+                           could not be compensated.
+        """
+
+        self.steps = {step.name: step for step in steps}
+        if len(self.steps) != len(steps):
+            raise ValueError('Saga step names must be unique')
+
+        self.order = [step.name for step in steps]
+        self._position = {name: position for position, name in enumerate(self.order)}
+        self.compensate = compensate
+        self.dependents: Dict[str, List[str]] = {name: [] for name in self.order}
+
+        for step in steps:
+            for dependency in step.depends_on:
+                if dependency not in self.steps:
+                    raise ValueError(f'Step {step.name} depends on unknown step {dependency}')
+                self.dependents[dependency].append(step.name)
+
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        remaining = {name: len(self.steps[name].depends_on) for name in self.order}
+        ready = [name for name, count in remaining.items() if count == 0]
+        visited = 0
+
+        while ready:
+            name = ready.pop()
+            visited += 1
+            for dependent in self.dependents[name]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+
+        if visited != len(self.order):
+            raise ValueError('Saga steps contain a dependency cycle')
+
+    async def run(
+            self,
+            max_in_flight: Optional[int] = None,
+            compensation_concurrency: Optional[int] = None,
+            compensation_timeout: Optional[float] = None,
+    ) -> SagaResult:
+        """
+        Run the saga, compensating the started steps if any step fails.
+
+        :param max_in_flight: Maximum number of steps running at the same time. When `None`, every ready step starts.
+        :param compensation_concurrency: Maximum number of compensations running at the same time.
+        :param compensation_timeout: Deadline in seconds of the per-step compensation. Steps not compensated by then
+                                     are reported as uncompensated.
+        :return: The outcome of the saga.
+        """
+
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError('max_in_flight must be a positive integer')
+        if compensation_concurrency is not None and compensation_concurrency < 1:
+            raise ValueError('compensation_concurrency must be a positive integer')
+
+        result = SagaResult()
+        started: List[str] = []
+        failed = set()
+        remaining = {name: set(self.steps[name].depends_on) for name in self.order}
+        ready = deque(name for name in self.order if not remaining[name])
+        running: Dict[asyncio.Task, str] = {}
+
+        try:
+            while (ready or running) and result.error is None:
+                while ready and (max_in_flight is None or len(running) < max_in_flight):
+                    name = ready.popleft()
+                    started.append(name)
+                    running[asyncio.create_task(self.steps[name].action(result.results))] = name
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in sorted(done, key=lambda done_task: self._position[running[done_task]]):
+                    name = running.pop(task)
+                    if task.exception() is not None:
+                        failed.add(name)
+                        if result.error is None:
+                            result.failed_step, result.error = name, task.exception()
+                        continue
+
+                    result.results[name] = task.result()
+                    for dependent in self.dependents[name]:
+                        remaining[dependent].discard(name)
+                        if not remaining[dependent]:
+                            ready.append(dependent)
+
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        if result.error is None:
+            result.success = True
+            return result
+
+        logger.error(f'Saga step {result.failed_step} failed, compensating. Detail: {result.error}')
+
+        to_compensate = [name for name in started if name not in failed]
+        if self.compensate is not None:
+            result.uncompensated = list(await self.compensate(to_compensate))
+        else:
+            to_compensate = [name for name in to_compensate if self.steps[name].compensation is not None]
+            result.uncompensated = await self._compensate_steps(
+                to_compensate, result.results, compensation_concurrency, compensation_timeout
+            )
+
+        result.compensated = [name for name in to_compensate if name not in result.uncompensated]
+        return result
+
+    async def _compensate_steps(
+            self,
+            names: List[str],
+            results: Dict[str, Any],
+            concurrency: Optional[int],
+            timeout: Optional[float],
+    ) -> List[str]:
+        if not names:
+            return []
+
+        semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        finished = {name: asyncio.Event() for name in names}
+        succeeded = set()
+
+        async def compensate(name: str) -> None:
+            try:
+                for dependent in self.dependents[name]:
+                    if dependent in finished:
+                        await finished[dependent].wait()
+
+                if semaphore is None:
+                    await self.steps[name].compensation(results)
+                else:
+                    async with semaphore:
+                        await self.steps[name].compensation(results)
+                succeeded.add(name)
+
+            except Exception as exc:
+                logger.error(f'Compensation of saga step {name} failed: {exc}')
+            finally:
+                finished[name].set()
+
+        tasks = [asyncio.create_task(compensate(name)) for name in names]
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.error(f'Saga compensation did not finish within {timeout}s')
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        return [name for name in names if name not in succeeded]
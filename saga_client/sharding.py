@@ -0,0 +1,207 @@
+"""
+Run sagas across a pool of worker processes, sharded by group ID.
+
+A single event loop running `SagaClient` is bound to one CPU core. `ShardedExecutor` starts a worker process per core,
+each with its own event loop, connection pool and `SagaClient`, and routes every operation to the worker chosen by a
+stable hash of its group ID, so operations on the same group stay ordered within one worker.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import zlib
+from collections import Counter
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .cli import OPERATIONS, run_operation
+from .client import SagaClient, run_many
+from .exceptions import GroupOperationException
+from .instrumentation import Hooks, MetricsCollector
+
+logger = logging.getLogger(__name__)
+
+
+def shard_for(group_id: str, shards: int) -> int:
+    """
+    :return: The shard of `group_id`, stable across processes, unlike the built-in `hash`.
+    """
+
+    return zlib.crc32(group_id.encode()) % shards
+
+
+class ShardedExecutor:
+    """
+    Shards create, delete and verify operations over worker processes and aggregates their results and metrics.
+
+    Each call to `run` starts the workers, streams the operations to them and stops them once all results are in.
+    `metrics` and `retry_stats` accumulate the `MetricsCollector` metrics and `RetryPolicy.stats` of all workers.
+    """
+
+    def __init__(
+            self,
+            workers: Optional[int] = None,
+            concurrency: int = 100,
+            client_factory: Callable[..., SagaClient] = SagaClient,
+            client_kwargs: Optional[Dict[str, Any]] = None,
+            queue_size: int = 1000,
+            mp_context: Optional[str] = None,
+    ):
+        """
+        :param workers: Number of worker processes, by default one per CPU core.
+        :param concurrency: Maximum number of operations in flight in each worker.
+        :param client_factory: Picklable callable building the `SagaClient` of a worker from `client_kwargs`. It
+            also receives the worker's `hooks`, which the executor uses to collect metrics.
+        :param client_kwargs: Picklable keyword arguments for `client_factory`, e.g. `hosts` or `max_per_host`.
+        :param queue_size: Maximum number of operations queued for each worker before the input is read further.
+        :param mp_context: The multiprocessing start method, by default the platform's default.
+        """
+
+        self.workers = workers or os.cpu_count() or 1
+        self.concurrency = concurrency
+        self.client_factory = client_factory
+        self.client_kwargs = client_kwargs or {}
+        self.queue_size = queue_size
+        self.context = multiprocessing.get_context(mp_context)
+        self.metrics = MetricsCollector(Hooks())
+        self.retry_stats: Counter = Counter()
+
+    def run(self, operations: Iterable[Tuple[str, str]]) -> Iterator[Dict[str, Any]]:
+        """
+        Run `(operation, group_id)` pairs, where the operation is `create`, `delete` or `verify`.
+
+        Operations are read lazily from `operations` as the workers' queues drain. Operations on the same group run
+        one after the other, in input order.
+
+        :return: An iterator of result dicts, in completion order, with the `operation`, `group_id`, `success` and
+            `seconds` of each operation, plus the `failed_hosts` of deletions and verifications or an `error`.
+        :raises GroupOperationException: If a worker fails.
+        """
+
+        inboxes = [self.context.Queue(self.queue_size) for _ in range(self.workers)]
+        results = self.context.Queue()
+        processes = [
+            self.context.Process(
+                target=_worker,
+                args=(index, self.client_factory, self.client_kwargs, self.concurrency, inboxes[index], results),
+                daemon=True,
+            )
+            for index in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        stopped = threading.Event()
+        feeder = threading.Thread(target=self._feed, args=(operations, inboxes, stopped), daemon=True)
+        feeder.start()
+
+        running = self.workers
+        try:
+            while running:
+                try:
+                    message = results.get(timeout=1)
+                except queue.Empty:
+                    for index, process in enumerate(processes):
+                        if process.exitcode not in (None, 0):
+                            raise GroupOperationException(f'Worker {index} exited with code {process.exitcode}')
+                    continue
+
+                kind, payload = message
+                if kind == 'result':
+                    yield payload
+                elif kind == 'done':
+                    metrics, retry_stats = payload
+                    self.metrics.merge(metrics)
+                    self.retry_stats.update(retry_stats)
+                    running -= 1
+                else:
+                    raise GroupOperationException(payload)
+
+        finally:
+            stopped.set()
+            for process in processes:
+                if running:
+                    process.terminate()
+                process.join()
+
+    def _feed(self, operations: Iterable[Tuple[str, str]], inboxes: List[Any], stopped: threading.Event) -> None:
+        try:
+            for operation, group_id in operations:
+                if not self._put(inboxes[shard_for(group_id, self.workers)], (operation, group_id), stopped):
+                    return
+        except Exception as exc:
+            logger.error(f'Reading operations failed, stopping after the queued ones. Detail: {exc}')
+
+        for inbox in inboxes:
+            if not self._put(inbox, None, stopped):
+                return
+
+    @staticmethod
+    def _put(inbox: Any, item: Any, stopped: threading.Event) -> bool:
+        while not stopped.is_set():
+            try:
+                inbox.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+def _worker(
+        index: int,
+        client_factory: Callable[..., SagaClient],
+        client_kwargs: Dict[str, Any],
+        concurrency: int,
+        inbox: Any,
+        results: Any,
+) -> None:
+    try:
+        asyncio.run(_serve(client_factory, client_kwargs, concurrency, inbox, results))
+    except Exception as exc:
+        results.put(('error', f'Worker {index} failed: {exc}'))
+
+
+async def _serve(
+        client_factory: Callable[..., SagaClient],
+        client_kwargs: Dict[str, Any],
+        concurrency: int,
+        inbox: Any,
+        results: Any,
+) -> None:
+    loop = asyncio.get_running_loop()
+    hooks = Hooks()
+    metrics = MetricsCollector(hooks)
+    # the last operation queued for each group, which the next operation on the group waits for
+    previous: Dict[str, asyncio.Future] = {}
+
+    async def records():
+        while True:
+            item = await loop.run_in_executor(None, inbox.get)
+            if item is None:
+                return
+            operation, group_id = item
+            if operation in OPERATIONS:
+                yield {'operation': operation, 'group_id': group_id}
+            else:
+                yield {'operation': operation, 'group_id': group_id, 'error': f'unknown operation {operation}'}
+
+    async def run_in_order(client: SagaClient, record: Dict[str, Any]) -> Dict[str, Any]:
+        group_id = record['group_id']
+        waiting = previous.get(group_id)
+        finished = previous[group_id] = loop.create_future()
+        try:
+            if waiting is not None:
+                await waiting
+            return await run_operation(client, record)
+        finally:
+            finished.set_result(None)
+            if previous.get(group_id) is finished:
+                del previous[group_id]
+
+    async with client_factory(hooks=hooks, **client_kwargs) as client:
+        async for _, result in run_many(partial(run_in_order, client), records(), concurrency):
+            results.put(('result', result))
+
+    results.put(('done', (metrics, client.retry_policy.stats)))
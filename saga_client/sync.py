@@ -0,0 +1,166 @@
+"""
+Synchronous facade over `SagaClient` for callers without an event loop, such as Django views or Celery tasks.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from .client import SagaClient
+
+logger = logging.getLogger(__name__)
+
+
+class SyncSagaClient:
+    """
+    Runs a `SagaClient` on one persistent event loop in a background thread and exposes it to synchronous code.
+
+    The loop and its connection pool are started on first use and shared by all calling threads, so sync callers get
+    the same connection reuse and concurrency as async ones instead of a new loop per `asyncio.run`. All methods are
+    thread-safe. After a fork, e.g. in a prefork worker pool, the child process starts its own loop on first use.
+    """
+
+    def __init__(self, **client_kwargs):
+        """
+        :param client_kwargs: Keyword arguments for the `SagaClient`, e.g. `hosts`, `max_per_host` or `saga_timeout`.
+        """
+
+        self.client_kwargs = client_kwargs
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[SagaClient] = None
+        self._pid: Optional[int] = None
+        self._closed = False
+        self._futures: Set[concurrent.futures.Future] = set()
+
+    def __enter__(self) -> 'SyncSagaClient':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _start(self) -> SagaClient:
+        """
+        Start the loop thread and open the client, unless already done in this process. Call it holding `_lock`.
+        """
+
+        if self._closed:
+            raise RuntimeError('SyncSagaClient is closed')
+        if self._client is not None and self._pid == os.getpid():
+            return self._client
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name='saga-client-loop', daemon=True)
+        thread.start()
+
+        async def open_client() -> SagaClient:
+            return await SagaClient(**self.client_kwargs).__aenter__()
+
+        try:
+            client = asyncio.run_coroutine_threadsafe(open_client(), loop).result()
+        except BaseException:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+            raise
+
+        self._loop, self._thread, self._client, self._pid = loop, thread, client, os.getpid()
+        self._futures = set()
+        return client
+
+    def submit(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> concurrent.futures.Future:
+        """
+        Schedule `fn(client, *args, **kwargs)` on the background loop, e.g. `submit(SagaClient.create_group, 'g1')`.
+
+        :return: A `concurrent.futures.Future` of the result. Cancelling it cancels `fn`, but a `create_group` or a
+            full `delete_group` keeps running, since its run is shared with concurrent callers of the same group.
+            The future is cancelled if the facade is closed before `fn` has finished.
+        :raises RuntimeError: If the facade is closed.
+        """
+
+        with self._lock:
+            client = self._start()
+            future = asyncio.run_coroutine_threadsafe(fn(client, *args, **kwargs), self._loop)
+            self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        return future
+
+    def create_group(self, group_id: str, timeout: Optional[float] = None) -> bool:
+        """
+        Create a group, blocking until the saga has finished. See `SagaClient.create_group`.
+
+        :param timeout: Maximum number of seconds to wait, after which `concurrent.futures.TimeoutError` is raised
+            and the saga continues in the background.
+        """
+
+        return self.submit(SagaClient.create_group, group_id).result(timeout)
+
+    def delete_group(
+            self,
+            group_id: str,
+            quorum: Optional[int] = None,
+            on_complete: Optional[Callable[[List[str]], Any]] = None,
+            timeout: Optional[float] = None,
+    ) -> List[str]:
+        """
+        Delete a group, blocking until it is deleted. See `SagaClient.delete_group`.
+
+        `on_complete` is called in the background loop thread.
+        """
+
+        return self.submit(SagaClient.delete_group, group_id, quorum=quorum, on_complete=on_complete).result(timeout)
+
+    def verify_group(self, group_id: str, timeout: Optional[float] = None) -> List[str]:
+        """
+        Verify a group, blocking until all hosts have answered. See `SagaClient.verify_group`.
+        """
+
+        return self.submit(SagaClient.verify_group, group_id).result(timeout)
+
+    def recover(self, timeout: Optional[float] = None) -> Dict[str, List[str]]:
+        """
+        Roll back the sagas left unfinished in the journal. See `SagaClient.recover`.
+        """
+
+        return self.submit(SagaClient.recover).result(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Close the client, waiting for background deletions, then stop the loop thread. Idempotent.
+
+        Operations submitted before and still running are cancelled, and new ones raise `RuntimeError`.
+        """
+
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            loop, thread, client = self._loop, self._thread, self._client
+            if client is None or self._pid != os.getpid():
+                return
+
+        async def shut_down() -> None:
+            try:
+                await client.aclose()
+            finally:
+                # Operations still running would never finish once the loop stops, so their callers must not wait
+                tasks = asyncio.all_tasks() - {asyncio.current_task()}
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(shut_down(), loop).result(timeout)
+        except Exception as exc:
+            logger.error(f'Error while closing the saga client. Detail: {exc}')
+        finally:
+            # Also when shutting down timed out
+            for future in list(self._futures):
+                future.cancel()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not thread.is_alive():
+                loop.close()
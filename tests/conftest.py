@@ -0,0 +1,28 @@
+import pytest
+
+from benchmarks.fake_service import FakeGroupService
+from saga_client.client import SagaClient
+
+
+@pytest.fixture
+def hosts():
+    return ['http://127.0.0.1:8000', 'http://127.0.0.1:8001']
+
+
+@pytest.fixture
+def service():
+    return FakeGroupService()
+
+
+@pytest.fixture
+def fake_client(hosts, service):
+    """
+    Build a `SagaClient` for `hosts`, served by `fake_service` or, by default, by the `service` fixture.
+    """
+
+    def build(fake_service=None, **kwargs):
+        if fake_service is None:
+            fake_service = service
+        return SagaClient(hosts=hosts, transport=fake_service.transport(), **kwargs)
+
+    return build
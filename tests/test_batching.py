@@ -0,0 +1,117 @@
+import asyncio
+import json
+from unittest import mock
+
+import httpx
+import pytest
+
+from benchmarks.fake_service import FakeGroupService
+from saga_client.batching import Batcher
+from saga_client.client import SagaClient
+from saga_client.retry import RetryPolicy
+
+
+@pytest.mark.asyncio
+async def test_operations_batched_into_bulk_requests(fake_client, hosts):
+    service = FakeGroupService(bulk=True)
+    batcher = Batcher(max_batch_size=10, max_delay=0.01)
+
+    async with fake_client(service, batcher=batcher) as client:
+        results = await asyncio.gather(*(client.create_group(f'g{i}') for i in range(10)))
+
+    assert results == [True] * 10
+    assert all(len(service.groups[host]) == 10 for host in hosts)
+    # One bulk create and one bulk verify per host
+    assert service.requests == {hosts[0]: 2, hosts[1]: 2}
+
+
+@pytest.mark.asyncio
+async def test_host_without_bulk_endpoint_falls_back(fake_client, hosts):
+    service = FakeGroupService(bulk=False)
+    batcher = Batcher(max_delay=0)
+
+    async with fake_client(service, batcher=batcher) as client:
+        assert await client.create_group('g1') is True
+        assert batcher.unsupported_hosts == set(hosts)
+        assert await client.delete_group('g1') == []
+
+    assert all(not service.groups[host] for host in hosts)
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_fails_its_operations(hosts):
+    batcher = Batcher(max_delay=0)
+
+    async def sender(client, host, operation, group_ids):
+        raise RuntimeError('bulk endpoint down')
+
+    results = await asyncio.gather(
+        *(batcher.submit(sender, None, hosts[0], 'verify', f'g{i}') for i in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert batcher.unsupported_hosts == set()
+
+
+@pytest.mark.asyncio
+async def test_batch_flushed_when_full(hosts):
+    batcher = Batcher(max_batch_size=3, max_delay=10)
+    batches = []
+
+    async def sender(client, host, operation, group_ids):
+        batches.append(group_ids)
+        return {group_id: 200 for group_id in group_ids}
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*(batcher.submit(sender, None, hosts[0], 'verify', f'g{i}') for i in range(3))), timeout=1
+    )
+
+    assert results == [200, 200, 200]
+    assert batches == [['g0', 'g1', 'g2']]
+
+
+@pytest.mark.asyncio
+async def test_retryable_status_in_batch_backs_off(hosts):
+    retry_policy = RetryPolicy(min_wait=0, max_wait=0)
+    client = SagaClient(hosts=hosts, batcher=Batcher(max_delay=0), retry_policy=retry_policy)
+    statuses = iter([503, 200])
+
+    async def bulk_request(http_client, host, operation, group_ids):
+        return {group_id: next(statuses) for group_id in group_ids}
+
+    with mock.patch.object(client, '_bulk_request', side_effect=bulk_request), \
+            mock.patch.object(client, '_request') as request:
+        assert await client.verify_group_on_host(None, hosts[0], 'g1') is True
+
+    request.assert_not_called()
+    assert retry_policy.stats['retry:503'] == 1
+
+
+@pytest.mark.asyncio
+async def test_overloaded_bulk_request_backs_off(hosts):
+    requests = []
+
+    def handle(request):
+        requests.append(request)
+        if request.method != 'POST':
+            return httpx.Response(200)
+        if len(requests) == 1:
+            return httpx.Response(503, headers={'Retry-After': '0'})
+        group_ids = json.loads(request.content)['groupIds']
+        return httpx.Response(200, json={'results': {group_id: 200 for group_id in group_ids}})
+
+    retry_policy = RetryPolicy(min_wait=0, max_wait=0)
+    client = SagaClient(
+        hosts=hosts,
+        transport=httpx.MockTransport(handle),
+        batcher=Batcher(max_delay=0.01),
+        retry_policy=retry_policy,
+    )
+
+    async with client, client.session() as http:
+        results = await asyncio.gather(*(client.verify_group_on_host(http, hosts[0], f'g{i}') for i in range(5)))
+
+    assert results == [True] * 5
+    # the 503 was retried as a bulk request, not followed by a single GET per group
+    assert [request.method for request in requests] == ['POST', 'POST']
+    assert retry_policy.stats['retry:503'] == 5
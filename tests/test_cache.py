@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from saga_client.cache import CREATED, DELETED, GroupStateCache
+
+
+def test_verified_state_is_cached_until_ttl():
+    cache = GroupStateCache(ttl=0.05)
+    cache.set('host', 'g1', True)
+
+    assert cache.get('host', 'g1') is True
+    time.sleep(0.06)
+    assert cache.get('host', 'g1') is None
+    assert cache.stats == {'hit': 1, 'miss': 1, 'expired': 1}
+    assert cache.hit_rate == 0.5
+
+
+def test_write_responses_are_trusted_only_by_policy():
+    cache = GroupStateCache()
+    cache.set('host', 'g1', True, CREATED)
+    cache.set('host', 'g2', False, DELETED)
+    assert cache.get('host', 'g1') is None
+    assert cache.get('host', 'g2') is None
+
+    cache = GroupStateCache(trust_created=True, trust_deleted=True)
+    cache.set('host', 'g1', True, CREATED)
+    cache.set('host', 'g2', False, DELETED)
+    assert cache.get('host', 'g1') is True
+    assert cache.get('host', 'g2') is False
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = GroupStateCache(max_size=2)
+    cache.set('host', 'g1', True)
+    cache.set('host', 'g2', True)
+    cache.get('host', 'g1')
+    cache.set('host', 'g3', True)
+
+    assert cache.get('host', 'g2') is None
+    assert cache.get('host', 'g1') is True
+    assert cache.stats['evicted'] == 1
+
+
+def test_verification_sent_before_invalidation_is_not_cached():
+    cache = GroupStateCache()
+    sent_at = time.monotonic()
+    cache.invalidate('host', 'g1')
+    cache.set('host', 'g1', True, since=sent_at)
+
+    assert cache.get('host', 'g1') is None
+
+    cache.set('host', 'g1', False, since=time.monotonic())
+    assert cache.get('host', 'g1') is False
+
+
+@pytest.mark.asyncio
+async def test_trusted_creation_skips_verification_requests(service, fake_client, hosts):
+    cache = GroupStateCache(trust_created=True)
+
+    async with fake_client(state_cache=cache) as client:
+        assert await client.create_group('test_group') is True
+        assert await client.verify_group('test_group') == []
+
+    assert service.requests == {hosts[0]: 1, hosts[1]: 1}
+
+
+@pytest.mark.asyncio
+async def test_mutation_invalidates_cached_verification(service, fake_client, hosts):
+    cache = GroupStateCache()
+
+    async with fake_client(state_cache=cache) as client:
+        assert await client.create_group('test_group') is True
+        assert await client.verify_group('test_group') == []
+        assert service.requests == {hosts[0]: 2, hosts[1]: 2}
+
+        assert await client.delete_group('test_group') == []
+        assert await client.verify_group('test_group') == hosts
+        assert await client.verify_group('test_group') == hosts
+
+    assert service.requests == {hosts[0]: 4, hosts[1]: 4}
+    assert cache.stats['hit'] == 4
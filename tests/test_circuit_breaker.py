@@ -0,0 +1,48 @@
+import pytest
+from unittest import mock
+
+from saga_client.circuit_breaker import CircuitBreaker
+from saga_client.exceptions import CircuitOpenException
+
+
+def test_opens_after_failure_threshold():
+    breaker = CircuitBreaker('http://host', failure_threshold=2, recovery_timeout=30)
+
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenException):
+        breaker.before_request()
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker('http://host', failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+
+    with mock.patch('saga_client.circuit_breaker.time.monotonic', return_value=breaker._opened_at + 31):
+        breaker.before_request()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        with pytest.raises(CircuitOpenException):
+            breaker.before_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_request()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker('http://host', failure_threshold=3, recovery_timeout=0)
+    for _ in range(3):
+        breaker.record_failure()
+
+    breaker.before_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,81 @@
+import asyncio
+import io
+import json
+import os
+
+import pytest
+
+from saga_client import cli
+
+
+@pytest.mark.asyncio
+async def test_read_records_flags_invalid_lines():
+    lines = '{"operation": "create", "group_id": "g1"}\n\nnot json\n{"operation": "rename", "group_id": "g2"}\n'
+
+    records = [record async for record in cli.read_records(io.StringIO(lines))]
+
+    assert records[0] == {'operation': 'create', 'group_id': 'g1'}
+    assert records[1]['line'] == 3 and 'invalid record' in records[1]['error']
+    assert records[2]['line'] == 4 and 'invalid record' in records[2]['error']
+
+
+@pytest.mark.asyncio
+async def test_replay_writes_one_result_per_operation(service, fake_client, hosts):
+    operations = [{'operation': 'create', 'group_id': f'g{i}'} for i in range(20)]
+    input_file = io.StringIO(''.join(json.dumps(operation) + '\n' for operation in operations) + 'oops\n')
+    output_file = io.StringIO()
+
+    async with fake_client() as client:
+        summary = await cli.replay(client, input_file, output_file, concurrency=5)
+
+    results = [json.loads(line) for line in output_file.getvalue().splitlines()]
+    assert len(results) == 21
+    assert sorted(result['group_id'] for result in results if result['success']) == sorted(f'g{i}' for i in range(20))
+    assert summary['operations'] == 21
+    assert summary['succeeded'] == 20
+    assert summary['failed'] == 1
+    assert all(len(service.groups[host]) == 20 for host in hosts)
+
+
+@pytest.mark.asyncio
+async def test_verify_result_reports_failed_hosts(service, fake_client, hosts):
+    service.groups[hosts[0]] = {'g1'}
+    input_file = io.StringIO('{"operation": "verify", "group_id": "g1"}\n')
+    output_file = io.StringIO()
+
+    async with fake_client() as client:
+        await cli.replay(client, input_file, output_file, concurrency=1)
+
+    result = json.loads(output_file.getvalue())
+    assert result['success'] is False
+    assert result['failed_hosts'] == [hosts[1]]
+
+
+@pytest.mark.asyncio
+async def test_result_written_before_input_ends(service, fake_client):
+    read_fd, write_fd = os.pipe()
+    output_file = io.StringIO()
+
+    with os.fdopen(read_fd) as input_file, os.fdopen(write_fd, 'w') as writer:
+        writer.write('{"operation": "create", "group_id": "g1"}\n')
+        writer.flush()
+
+        async with fake_client() as client:
+            replay = asyncio.create_task(cli.replay(client, input_file, output_file, concurrency=10))
+            for _ in range(100):
+                if output_file.getvalue():
+                    break
+                await asyncio.sleep(0.01)
+
+            assert json.loads(output_file.getvalue())['success'] is True
+            assert not replay.done()
+
+            writer.close()
+            assert (await replay)['operations'] == 1
+
+
+def test_concurrency_must_be_positive(capsys):
+    with pytest.raises(SystemExit):
+        cli.parse_args(['--concurrency', '0'])
+
+    assert 'not a positive integer' in capsys.readouterr().err
@@ -1,3 +1,6 @@
+import asyncio
+import json
+import time
 import pytest
 import httpx
 import tenacity
@@ -5,6 +8,8 @@ from unittest import mock
 from saga_client.client import SagaClient
 from httpx import Response, RequestError, TimeoutException
 from saga_client.config import HOSTS
+from saga_client.exceptions import CircuitOpenException, DeadlineExceededException
+from saga_client.retry import RetryPolicy, deadline, parse_retry_after
 
 
 @pytest.fixture
@@ -258,3 +263,394 @@ async def test_verify_group_on_host_unexpected_exception(mock_async_client):
     with mock.patch.object(mock_async_client, 'get', side_effect=UnexpectedException('Unexpected error')):
         with pytest.raises(UnexpectedException):
             await client.verify_group_on_host(mock_async_client, HOSTS[0], 'test_group')
+
+
+@pytest.mark.asyncio
+async def test_create_group_concurrent_success(mock_async_client):
+    client = SagaClient(hosts=HOSTS, max_in_flight=2)
+
+    with mock.patch.object(client, 'create_group_on_host', return_value=True), \
+            mock.patch.object(client, 'verify_group_on_host', return_value=True) as verify:
+        result = await client.create_group('test_group')
+        assert result is True
+        assert verify.call_count == len(HOSTS)
+
+
+@pytest.mark.asyncio
+async def test_create_group_concurrent_rollback(mock_async_client):
+    client = SagaClient(hosts=HOSTS, max_in_flight=len(HOSTS))
+
+    async def create(_client, host, _group_id):
+        return host != HOSTS[1]
+
+    with mock.patch.object(client, 'create_group_on_host', side_effect=create), \
+            mock.patch.object(client, 'verify_group_on_host', return_value=True), \
+            mock.patch.object(client, 'rollback_creation', return_value=[]) as rollback:
+        result = await client.create_group('test_group')
+        assert result is False
+        rollback.assert_called_once()
+        assert HOSTS[1] not in rollback.call_args.args[2]
+
+
+@pytest.mark.asyncio
+async def test_context_manager_shares_client():
+    async with SagaClient(hosts=HOSTS, keepalive_expiry=30) as client:
+        shared = client._client
+        assert shared is not None
+        assert client.limits.keepalive_expiry == 30
+
+        with mock.patch.object(client, '_delete_group_on_host', return_value=True) as delete:
+            await client.delete_group('test_group')
+            assert all(call.args[0] is shared for call in delete.call_args_list)
+
+    assert client._client is None
+    assert shared.is_closed
+
+
+@pytest.mark.asyncio
+async def test_create_groups_bounded_concurrency():
+    client = SagaClient(hosts=HOSTS)
+    running = 0
+    peak = 0
+
+    async def create(group_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0)
+        running -= 1
+        return group_id != 'g3'
+
+    with mock.patch.object(client, 'create_group', side_effect=create):
+        results = dict([result async for result in client.create_groups((f'g{i}' for i in range(10)), concurrency=3)])
+
+    assert len(results) == 10
+    assert results['g3'] is False
+    assert peak <= 3
+
+
+@pytest.mark.asyncio
+async def test_delete_groups_async_iterable():
+    client = SagaClient(hosts=HOSTS)
+
+    async def group_ids():
+        for group_id in ('a', 'b'):
+            yield group_id
+
+    with mock.patch.object(client, 'delete_group', return_value=[]):
+        results = [result async for result in client.delete_groups(group_ids())]
+
+    assert sorted(results) == [('a', []), ('b', [])]
+
+
+@pytest.mark.asyncio
+async def test_create_groups_yields_results_before_slow_source_ends():
+    client = SagaClient(hosts=HOSTS)
+    source_finished = False
+
+    async def group_ids():
+        nonlocal source_finished
+        for i in range(5):
+            yield f'g{i}'
+            await asyncio.sleep(0.05)
+        source_finished = True
+
+    with mock.patch.object(client, 'create_group', return_value=True):
+        async for group_id, success in client.create_groups(group_ids(), concurrency=100):
+            assert group_id == 'g0' and success is True
+            assert not source_finished
+            break
+
+
+@pytest.mark.asyncio
+async def test_max_per_host_limits_requests(mock_async_client):
+    client = SagaClient(hosts=HOSTS, max_per_host=1)
+    running = 0
+    peak = 0
+
+    async def post(*args, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0)
+        running -= 1
+        response = mock.Mock(spec=Response)
+        response.status_code = 201
+        return response
+
+    with mock.patch.object(mock_async_client, 'post', side_effect=post):
+        await asyncio.gather(*(client.create_group_on_host(mock_async_client, HOSTS[0], f'g{i}') for i in range(5)))
+
+    assert peak == 1
+
+
+def test_rollback_concurrency_must_be_positive():
+    with pytest.raises(ValueError, match='rollback_concurrency must be a positive integer'):
+        SagaClient(hosts=HOSTS, rollback_concurrency=0)
+
+
+@pytest.mark.asyncio
+async def test_rollback_creation_timeout(mock_async_client):
+    client = SagaClient(hosts=HOSTS, rollback_timeout=0.05)
+
+    async def delete(_client, host, _group_id):
+        if host == HOSTS[1]:
+            await asyncio.sleep(1)
+        return True
+
+    with mock.patch.object(client, '_delete_group_on_host', side_effect=delete), \
+            mock.patch.object(client, 'verify_group_on_host', return_value=False):
+        undeleted_hosts = await client.rollback_creation(mock_async_client, 'test_group', HOSTS)
+        assert undeleted_hosts == [HOSTS[1]]
+
+
+@pytest.mark.asyncio
+async def test_rollback_creation_cancelled_cancels_hosts(mock_async_client):
+    client = SagaClient(hosts=HOSTS)
+    started = asyncio.Event()
+    cancelled = []
+
+    async def delete(_client, host, _group_id):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(host)
+            raise
+        return True
+
+    with mock.patch.object(client, '_delete_group_on_host', side_effect=delete):
+        rollback = asyncio.create_task(client.rollback_creation(mock_async_client, 'test_group', HOSTS))
+        await started.wait()
+        rollback.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await rollback
+
+    assert sorted(cancelled) == sorted(HOSTS)
+
+
+@pytest.mark.asyncio
+async def test_rollback_creation_retry_error(mock_async_client):
+    client = SagaClient(hosts=HOSTS, rollback_concurrency=1)
+
+    with mock.patch.object(mock_async_client, 'request', side_effect=RequestError('Request failed')), \
+            mock.patch('asyncio.sleep', new=mock.AsyncMock()):
+        undeleted_hosts = await client.rollback_creation(mock_async_client, 'test_group', HOSTS[:1])
+        assert undeleted_hosts == HOSTS[:1]
+
+
+@pytest.mark.asyncio
+async def test_delete_group_quorum_returns_early():
+    client = SagaClient(hosts=HOSTS)
+    slow_host_released = asyncio.Event()
+    on_complete = mock.Mock()
+
+    async def delete(_client, host, _group_id):
+        if host == HOSTS[2]:
+            await slow_host_released.wait()
+        return True
+
+    with mock.patch.object(client, '_delete_group_on_host', side_effect=delete):
+        result = await client.delete_group('test_group', quorum=2, on_complete=on_complete)
+        assert result == [HOSTS[2]]
+        on_complete.assert_not_called()
+
+        slow_host_released.set()
+        await client.aclose()
+
+    on_complete.assert_called_once_with([])
+
+
+@pytest.mark.asyncio
+async def test_delete_group_quorum_not_reached():
+    client = SagaClient(hosts=HOSTS)
+
+    with mock.patch.object(client, '_delete_group_on_host', side_effect=[True, False, False]):
+        result = await client.delete_group('test_group', quorum=2)
+        assert result == HOSTS[1:]
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_circuit_open_fails_fast(mock_async_client):
+    client = SagaClient(hosts=HOSTS, circuit_failure_threshold=2)
+
+    with mock.patch.object(mock_async_client, 'post', side_effect=RequestError('Request failed')) as post, \
+            mock.patch('asyncio.sleep', new=mock.AsyncMock()):
+        with pytest.raises(CircuitOpenException):
+            await client.create_group_on_host(mock_async_client, HOSTS[0], 'test_group')
+        assert post.call_count == 2
+
+        with pytest.raises(CircuitOpenException):
+            await client.create_group_on_host(mock_async_client, HOSTS[0], 'test_group')
+        assert post.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_request_timeout_cut_to_saga_deadline(mock_async_client):
+    client = SagaClient(hosts=HOSTS)
+
+    mock_response = mock.Mock(spec=Response)
+    mock_response.status_code = 201
+
+    with mock.patch.object(mock_async_client, 'post', return_value=mock_response) as post:
+        with deadline(2):
+            await client.create_group_on_host(mock_async_client, HOSTS[0], 'test_group')
+        assert 0 < post.call_args.kwargs['timeout'] <= 2
+
+
+@pytest.mark.asyncio
+async def test_no_retry_after_saga_deadline(mock_async_client):
+    client = SagaClient(hosts=HOSTS, retry_policy=RetryPolicy(attempts=5, jitter=False, min_wait=1))
+
+    with mock.patch.object(mock_async_client, 'post', side_effect=RequestError('Request failed')) as post:
+        with deadline(0.5):
+            with pytest.raises(tenacity.RetryError):
+                await client.create_group_on_host(mock_async_client, HOSTS[0], 'test_group')
+        assert post.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_request_after_saga_deadline_fails(mock_async_client):
+    client = SagaClient(hosts=HOSTS)
+
+    with deadline(0):
+        with pytest.raises(DeadlineExceededException):
+            await client.verify_group_on_host(mock_async_client, HOSTS[0], 'test_group')
+
+
+@pytest.mark.asyncio
+async def test_no_request_after_saga_deadline_while_queued_for_host_slot(mock_async_client):
+    client = SagaClient(hosts=HOSTS, max_per_host=1)
+    sent = []
+
+    async def post(_url, **kwargs):
+        sent.append((time.monotonic(), kwargs['timeout']))
+        await asyncio.sleep(0.3)
+        return Response(201)
+
+    with mock.patch.object(mock_async_client, 'post', side_effect=post):
+        with deadline(0.5):
+            expires_at = time.monotonic() + 0.5
+            results = await asyncio.gather(
+                *(client.create_group_on_host(mock_async_client, HOSTS[0], f'group_{i}') for i in range(4)),
+                return_exceptions=True,
+            )
+
+    assert results[:2] == [True, True]
+    assert all(isinstance(result, DeadlineExceededException) for result in results[2:])
+    assert len(sent) == 2
+    # the queued request got the time left when it was sent, not when it started waiting
+    assert all(sent_at + timeout <= expires_at + 0.01 for sent_at, timeout in sent)
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_retries_503_with_retry_after(mock_async_client):
+    client = SagaClient(hosts=HOSTS)
+
+    unavailable = Response(503, headers={'Retry-After': '0'})
+    created = Response(201)
+
+    with mock.patch.object(mock_async_client, 'post', side_effect=[unavailable, created]) as post:
+        result = await client.create_group_on_host(mock_async_client, HOSTS[0], 'test_group')
+        assert result is True
+        assert post.call_count == 2
+
+    assert client.retry_policy.stats['retry:503'] == 1
+    assert client.retry_policy.stats['recovered'] == 1
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_429_exhausted_returns_false(mock_async_client):
+    client = SagaClient(hosts=HOSTS, retry_policy=RetryPolicy(attempts=2))
+
+    with mock.patch.object(mock_async_client, 'post', return_value=Response(429, headers={'Retry-After': '0'})) as post:
+        result = await client.create_group_on_host(mock_async_client, HOSTS[0], 'test_group')
+        assert result is False
+        assert post.call_count == 2
+
+    assert client.retry_policy.stats['exhausted'] == 1
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_4xx_not_retried(mock_async_client):
+    client = SagaClient(hosts=HOSTS)
+
+    with mock.patch.object(mock_async_client, 'post', return_value=Response(409)) as post:
+        result = await client.create_group_on_host(mock_async_client, HOSTS[0], 'test_group')
+        assert result is False
+        assert post.call_count == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_create_group_coalesced():
+    client = SagaClient(hosts=HOSTS)
+
+    async def create(_client, _host, _group_id):
+        await asyncio.sleep(0)
+        return True
+
+    with mock.patch.object(client, 'create_group_on_host', side_effect=create) as create_on_host, \
+            mock.patch.object(client, 'verify_group_on_host', return_value=True):
+        results = await asyncio.gather(*(client.create_group('test_group') for _ in range(5)))
+
+    assert results == [True] * 5
+    assert create_on_host.call_count == len(HOSTS)
+    assert client._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_create_and_delete_same_group_serialized():
+    client = SagaClient(hosts=HOSTS)
+    events = []
+
+    async def create(_client, host, _group_id):
+        events.append(('create', host))
+        await asyncio.sleep(0)
+        return True
+
+    async def delete(_client, host, _group_id):
+        events.append(('delete', host))
+        return True
+
+    with mock.patch.object(client, 'create_group_on_host', side_effect=create), \
+            mock.patch.object(client, 'verify_group_on_host', return_value=True), \
+            mock.patch.object(client, '_delete_group_on_host', side_effect=delete):
+        await asyncio.gather(client.create_group('test_group'), client.delete_group('test_group'))
+
+    assert [operation for operation, _ in events] == ['create'] * len(HOSTS) + ['delete'] * len(HOSTS)
+    assert client._group_locks == {}
+
+
+def test_log_sampling_per_host():
+    client = SagaClient(hosts=HOSTS, log_sample_rate={HOSTS[0]: 0.25, HOSTS[1]: 0})
+
+    assert [client._log_sampled(HOSTS[0]) for _ in range(8)].count(True) == 2
+    assert not any(client._log_sampled(HOSTS[1]) for _ in range(8))
+    assert all(client._log_sampled(HOSTS[2]) for _ in range(8))
+
+
+@pytest.mark.parametrize('rate', [0.3, 0.7, 0.9])
+def test_log_sampling_logs_the_rate_of_calls(rate):
+    client = SagaClient(hosts=HOSTS, log_sample_rate=rate)
+
+    assert [client._log_sampled(HOSTS[0]) for _ in range(100)].count(True) == round(100 * rate)
+
+
+@pytest.mark.asyncio
+async def test_create_group_on_host_encoded_body(mock_async_client):
+    client = SagaClient(hosts=HOSTS)
+
+    mock_response = mock.Mock(spec=Response)
+    mock_response.status_code = 201
+
+    with mock.patch.object(mock_async_client, 'post', return_value=mock_response) as post:
+        await client.create_group_on_host(mock_async_client, HOSTS[0], 'test_group')
+        assert post.call_args.args[0] == f'{HOSTS[0]}/v1/group/'
+        assert json.loads(post.call_args.kwargs['content']) == {'groupId': 'test_group'}
@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks.bench_saga import parse_args, run_level
+from benchmarks.fake_service import FakeGroupService
+from saga_client.retry import RetryPolicy
+
+
+@pytest.mark.asyncio
+async def test_create_and_delete_group_against_fake_service(service, fake_client, hosts):
+    async with fake_client() as client:
+        assert await client.create_group('test_group') is True
+        assert all('test_group' in service.groups[host] for host in hosts)
+
+        assert await client.delete_group('test_group') == []
+        assert all(not service.groups[host] for host in hosts)
+
+    assert service.requests == {hosts[0]: 3, hosts[1]: 3}
+
+
+@pytest.mark.asyncio
+async def test_lost_create_rolled_back_against_fake_service(fake_client):
+    service = FakeGroupService(lost_create_rate=1.0)
+
+    async with fake_client(service, retry_policy=RetryPolicy(max_wait=0)) as client:
+        assert await client.create_group('test_group') is False
+
+
+@pytest.mark.asyncio
+async def test_benchmark_counts_injected_timeouts_as_failures():
+    args = parse_args([
+        '--hosts', '2', '--sagas', '10', '--timeout-rate', '0.6', '--max-wait', '0', '--latency', 'constant',
+        '--latency-ms', '0', '--seed', '1',
+    ])
+
+    result = await run_level(args, concurrency=5)
+
+    assert result['rollback_creation']['sagas'] == 10
+    assert result['create_group']['failures'] > 0
@@ -0,0 +1,130 @@
+import asyncio
+from unittest import mock
+
+import httpx
+import pytest
+from httpx import Response, RequestError
+
+from saga_client.circuit_breaker import CircuitBreaker
+from saga_client.client import SagaClient
+from saga_client.hedging import HedgePolicy
+
+HOST = 'http://127.0.0.1:8000'
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged():
+    policy = HedgePolicy(delay=0.01, budget=1)
+    calls = []
+
+    async def send():
+        calls.append(None)
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+            return Response(500)
+        return Response(200)
+
+    response = await policy.send('http://host', send)
+
+    assert response.status_code == 200
+    assert len(calls) == 2
+    assert policy.hedges == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_budget_exhausted():
+    policy = HedgePolicy(delay=0, budget=0)
+    calls = []
+
+    async def send():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return Response(200)
+
+    await policy.send('http://host', send)
+
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_falls_back_when_one_fails():
+    policy = HedgePolicy(delay=0.01, budget=1)
+    calls = []
+
+    async def send():
+        calls.append(None)
+        if len(calls) == 1:
+            await asyncio.sleep(0.05)
+            return Response(200)
+        raise RequestError('Request failed')
+
+    response = await policy.send('http://host', send)
+
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_losing_request_is_awaited():
+    policy = HedgePolicy(delay=0.01, budget=1)
+    calls = []
+    cancelled = []
+
+    async def send():
+        calls.append(None)
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(None)
+                raise
+        return Response(200)
+
+    response = await policy.send('http://host', send)
+
+    assert response.status_code == 200
+    assert len(cancelled) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('max_per_host, requests', [(1, 1), (2, 2)])
+async def test_hedge_needs_a_free_host_slot(max_per_host, requests):
+    policy = HedgePolicy(delay=0.01, budget=1)
+    client = SagaClient(hosts=[HOST], max_per_host=max_per_host, hedge_policy=policy)
+    http = mock.AsyncMock(spec=httpx.AsyncClient)
+
+    async def get(_url, **_kwargs):
+        await asyncio.sleep(0.05)
+        return Response(200)
+
+    http.get.side_effect = get
+
+    assert await client.verify_group_on_host(http, HOST, 'test_group') is True
+    assert http.get.call_count == requests
+    assert policy.hedges == requests - 1
+
+
+@pytest.mark.asyncio
+async def test_half_open_circuit_is_not_hedged():
+    policy = HedgePolicy(delay=0.01, budget=1)
+    client = SagaClient(hosts=[HOST], hedge_policy=policy, circuit_failure_threshold=1, circuit_recovery_timeout=0)
+    client._circuit_breaker(HOST).record_failure()
+    http = mock.AsyncMock(spec=httpx.AsyncClient)
+
+    async def get(_url, **_kwargs):
+        await asyncio.sleep(0.05)
+        return Response(200)
+
+    http.get.side_effect = get
+
+    assert await client.verify_group_on_host(http, HOST, 'test_group') is True
+    assert http.get.call_count == 1
+    assert client.circuit_breakers[HOST].state == CircuitBreaker.CLOSED
+
+
+def test_percentile_delay():
+    policy = HedgePolicy(percentile=0.9, min_samples=10)
+    for latency in range(10):
+        policy.record('http://host', latency / 10)
+
+    assert policy.hedge_delay('http://host') == 0.9
+    assert policy.hedge_delay('http://other') is None
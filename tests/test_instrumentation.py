@@ -0,0 +1,67 @@
+from unittest import mock
+
+import pytest
+from httpx import RequestError
+
+from saga_client.client import SagaClient
+from saga_client.exceptions import CircuitOpenException
+from saga_client.instrumentation import Hooks, MetricsCollector, SpanRecorder
+from saga_client.retry import RetryPolicy
+
+
+@pytest.mark.asyncio
+async def test_events_metrics_and_spans(fake_client, hosts):
+    hooks = Hooks()
+    metrics = MetricsCollector(hooks)
+    spans = SpanRecorder(hooks)
+    events = []
+    for event in Hooks.EVENTS:
+        hooks.on(event, lambda event=event, **fields: events.append(event))
+
+    async with fake_client(hooks=hooks) as client:
+        assert await client.create_group('test_group') is True
+
+    assert events[0] == 'saga_start' and events[-1] == 'saga_end'
+    assert events.count('step_end') == 4
+
+    text = metrics.prometheus()
+    assert f'saga_requests_total{{host="{hosts[0]}",step="create",outcome="201"}} 1' in text
+    assert 'saga_total{operation="create_group",outcome="success"} 1' in text
+    assert f'saga_request_duration_seconds_count{{host="{hosts[1]}",step="verify"}} 1' in text
+
+    exported = spans.export()
+    saga_span = next(span for span in exported if span['name'] == 'saga.create_group')
+    step_spans = [span for span in exported if span['parent_span_id'] == saga_span['span_id']]
+    assert len(step_spans) == 4
+    assert all(span['trace_id'] == saga_span['trace_id'] for span in step_spans)
+    assert spans.export() == []
+
+
+@pytest.mark.asyncio
+async def test_retry_circuit_and_rollback_events(hosts):
+    hooks = Hooks()
+    metrics = MetricsCollector(hooks)
+    client = SagaClient(
+        hosts=hosts,
+        hooks=hooks,
+        retry_policy=RetryPolicy(attempts=2, max_wait=0),
+        circuit_failure_threshold=1,
+    )
+    http = mock.AsyncMock()
+    http.post.side_effect = RequestError('Request failed')
+
+    with pytest.raises(CircuitOpenException):
+        await client.create_group_on_host(http, hosts[0], 'test_group')
+
+    with mock.patch.object(client, '_delete_group_on_host', return_value=False):
+        assert await client.rollback_creation(http, 'test_group', hosts) == hosts
+
+    assert metrics.retries[(hosts[0], 'RequestErrorException')] == 1
+    assert metrics.circuit_transitions[(hosts[0], 'open')] == 1
+    assert metrics.rollbacks['failure'] == 1
+
+
+def test_failing_callback_is_isolated():
+    hooks = Hooks()
+    hooks.on('rollback', mock.Mock(side_effect=RuntimeError('boom')))
+    hooks.emit('rollback', saga_id=None, group_id='g', hosts=[], undeleted_hosts=[])
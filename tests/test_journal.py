@@ -0,0 +1,107 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from saga_client.client import SagaClient
+from saga_client.config import HOSTS
+from saga_client.journal import SagaJournal
+
+
+@pytest.mark.asyncio
+async def test_concurrent_records_share_one_sync(tmp_path):
+    journal = SagaJournal(str(tmp_path / 'journal.jsonl'))
+
+    with mock.patch('saga_client.journal.os.fsync') as fsync:
+        await journal.record({'saga': 's0', 'event': 'begin', 'group_id': 'g0'})
+        await asyncio.gather(*(
+            journal.record({'saga': f's{i}', 'event': 'begin', 'group_id': f'g{i}'}) for i in range(1, 10)
+        ))
+        await journal.close()
+
+    assert fsync.call_count == 2
+    assert len(journal.unfinished()) == 10
+
+
+def test_unfinished_skips_ended_and_torn_records(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    path.write_text(
+        '{"saga": "a", "event": "begin", "group_id": "g1"}\n'
+        '{"saga": "a", "event": "creating", "host": "h1"}\n'
+        '{"saga": "a", "event": "creating", "host": "h2"}\n'
+        '{"saga": "a", "event": "create_failed", "host": "h2"}\n'
+        '{"saga": "b", "event": "begin", "group_id": "g2"}\n'
+        '{"saga": "b", "event": "end", "status": "completed"}\n'
+        '{"saga": "c", "event": "cre'
+    )
+
+    assert SagaJournal(str(path)).unfinished() == {'a': {'group_id': 'g1', 'hosts': ['h1']}}
+
+
+@pytest.mark.asyncio
+async def test_create_group_journaled(tmp_path):
+    journal = SagaJournal(str(tmp_path / 'journal.jsonl'))
+    client = SagaClient(hosts=HOSTS, journal=journal)
+
+    with mock.patch.object(client, 'create_group_on_host', return_value=True), \
+            mock.patch.object(client, 'verify_group_on_host', return_value=True):
+        assert await client.create_group('test_group') is True
+
+    await journal.close()
+    assert journal.unfinished() == {}
+
+
+@pytest.mark.asyncio
+async def test_recover_compensates_unfinished_saga(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    path.write_text(
+        '{"saga": "a", "event": "begin", "group_id": "g1"}\n'
+        f'{{"saga": "a", "event": "creating", "host": "{HOSTS[0]}"}}\n'
+    )
+    journal = SagaJournal(str(path))
+    client = SagaClient(hosts=HOSTS, journal=journal)
+
+    with mock.patch.object(client, 'rollback_creation', return_value=[]) as rollback:
+        assert await client.recover() == {'a': []}
+        assert rollback.call_args.args[1:] == ('g1', [HOSTS[0]])
+
+    assert journal.unfinished() == {}
+    assert path.read_text() == ''
+
+
+@pytest.mark.asyncio
+async def test_recover_keeps_unfinished_sagas_of_the_same_group_apart(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    path.write_text(
+        '{"saga": "a", "event": "begin", "group_id": "g1"}\n'
+        f'{{"saga": "a", "event": "creating", "host": "{HOSTS[0]}"}}\n'
+        '{"saga": "b", "event": "begin", "group_id": "g1"}\n'
+        f'{{"saga": "b", "event": "creating", "host": "{HOSTS[1]}"}}\n'
+    )
+    client = SagaClient(hosts=HOSTS, journal=SagaJournal(str(path)))
+
+    with mock.patch.object(client, 'rollback_creation', side_effect=[[HOSTS[0]], []]):
+        assert await client.recover() == {'a': [HOSTS[0]], 'b': []}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('failing_event, created', [('begin', False), ('end', True)])
+async def test_create_group_survives_journal_write_failure(tmp_path, failing_event, created):
+    journal = SagaJournal(str(tmp_path / 'journal.jsonl'))
+    client = SagaClient(hosts=HOSTS, journal=journal)
+    write = journal._write
+
+    def failing_write(lines):
+        if any(f'"event": "{failing_event}"' in line for line in lines):
+            raise OSError('No space left on device')
+        write(lines)
+
+    with mock.patch.object(journal, '_write', side_effect=failing_write), \
+            mock.patch.object(client, 'create_group_on_host', return_value=True) as create, \
+            mock.patch.object(client, 'verify_group_on_host', return_value=True):
+        assert await client.create_group('test_group') is created
+        assert create.called is created
+
+    await journal.close()
+    # a saga whose end could not be written is left for recovery
+    assert len(journal.unfinished()) == int(created)
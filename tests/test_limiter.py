@@ -0,0 +1,86 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from httpx import Response
+
+from saga_client.client import SagaClient
+from saga_client.limiter import AdaptiveLimit
+from saga_client.retry import RetryPolicy
+
+HOST = 'http://127.0.0.1:8000'
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_additively_and_shrinks_multiplicatively():
+    limiter = AdaptiveLimit(initial_limit=4, max_limit=10).limiter(HOST)
+
+    for _ in range(8):
+        await limiter.acquire()
+        limiter.release(0.01, overloaded=False)
+    assert 5 < limiter.limit < 7
+
+    await limiter.acquire()
+    limiter.release(0.01, overloaded=True)
+    assert 2.5 < limiter.limit < 3.5
+
+
+@pytest.mark.asyncio
+async def test_latency_spike_counts_as_congestion():
+    limiter = AdaptiveLimit(initial_limit=8, latency_tolerance=2).limiter(HOST)
+
+    await limiter.acquire()
+    limiter.release(0.01, overloaded=False)
+    limit = limiter.limit
+
+    await limiter.acquire()
+    with mock.patch('saga_client.limiter.time.monotonic', return_value=limiter._last_decrease + 1):
+        limiter.release(0.5, overloaded=False)
+    assert limiter.limit == limit / 2
+
+
+@pytest.mark.asyncio
+async def test_requests_above_limit_queue_in_order():
+    limiter = AdaptiveLimit(initial_limit=1, max_limit=1).limiter(HOST)
+    order = []
+
+    async def request(index):
+        await limiter.acquire()
+        order.append(index)
+        await asyncio.sleep(0)
+        limiter.release(0.001, overloaded=False)
+
+    await asyncio.gather(*(request(index) for index in range(5)))
+
+    assert order == list(range(5))
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_cap_delays_requests():
+    limiter = AdaptiveLimit(rate=1000, burst=1).limiter(HOST)
+    sleep = mock.AsyncMock()
+
+    with mock.patch('saga_client.limiter.asyncio.sleep', sleep):
+        await limiter.acquire()
+        await limiter.acquire()
+
+    sleep.assert_awaited_once()
+    assert 0 < sleep.await_args.args[0] <= 0.001
+
+
+@pytest.mark.asyncio
+async def test_client_feeds_429_back_to_limit():
+    client = SagaClient(
+        hosts=[HOST],
+        adaptive_limit=AdaptiveLimit(initial_limit=8),
+        retry_policy=RetryPolicy(retry_statuses=()),
+    )
+    http = mock.AsyncMock()
+    http.post.return_value = Response(400)
+
+    await client.create_group_on_host(http, HOST, 'test_group')
+    http.post.return_value = Response(429)
+    await client.create_group_on_host(http, HOST, 'test_group')
+
+    assert client.adaptive_limit.limiter(HOST).limit < 8
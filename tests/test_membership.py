@@ -0,0 +1,179 @@
+import asyncio
+from unittest import mock
+
+import httpcore
+import pytest
+
+from benchmarks.fake_service import FakeGroupService
+from saga_client.client import SagaClient
+from saga_client.membership import FileHostProvider, HostProvider, PollingHostProvider
+
+NEW_HOST = 'http://127.0.0.1:8002'
+
+
+@pytest.mark.asyncio
+async def test_file_host_provider_yields_changed_hosts(tmp_path):
+    path = tmp_path / 'hosts'
+    path.write_text('# cluster\nhttp://a, http://b\nhttp://c\n')
+    watch = FileHostProvider(str(path), interval=0.01).watch()
+
+    assert await watch.__anext__() == ['http://a', 'http://b', 'http://c']
+
+    path.write_text('http://a\n')
+    assert await asyncio.wait_for(watch.__anext__(), 1) == ['http://a']
+    await watch.aclose()
+
+
+@pytest.mark.asyncio
+async def test_polling_host_provider_skips_errors_and_empty_results():
+    results = iter([RuntimeError('discovery down'), [], ['http://a'], ['http://a'], ['http://b']])
+
+    def fetch():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    watch = PollingHostProvider(fetch, interval=0).watch()
+
+    assert await watch.__anext__() == ['http://a']
+    assert await watch.__anext__() == ['http://b']
+    await watch.aclose()
+
+
+@pytest.mark.asyncio
+async def test_running_saga_keeps_its_hosts_and_removed_host_is_drained(fake_client, hosts):
+    service = FakeGroupService(latency=lambda: 0.05)
+
+    async with fake_client(service, max_per_host=10) as client:
+        creation = asyncio.create_task(client.create_group('test_group'))
+        await asyncio.sleep(0.01)
+
+        await client.update_hosts([hosts[0], NEW_HOST])
+        assert client.hosts == [hosts[0], NEW_HOST]
+        assert service.requests[NEW_HOST] == 1
+        # the removed host is not drained while the saga started before the change runs
+        assert client._background_tasks and not any(task.done() for task in client._background_tasks)
+
+        assert await creation is True
+        assert all('test_group' in service.groups[host] for host in hosts)
+        assert 'test_group' not in service.groups.get(NEW_HOST, set())
+
+        await asyncio.gather(*client._background_tasks)
+        assert hosts[1] not in client._host_semaphores
+
+        assert await client.create_group('other_group') is True
+        assert 'other_group' in service.groups[NEW_HOST]
+        assert 'other_group' not in service.groups[hosts[1]]
+
+
+@pytest.mark.asyncio
+async def test_host_provider_updates_membership(service, fake_client):
+    provider = PollingHostProvider(lambda: [NEW_HOST], interval=0.01)
+
+    async with fake_client(host_provider=provider) as client:
+        for _ in range(100):
+            if client.hosts == [NEW_HOST]:
+                break
+            await asyncio.sleep(0.01)
+
+        assert await client.create_group('test_group') is True
+
+    assert service.groups[NEW_HOST] == {'test_group'}
+    assert client._host_watch is None
+
+
+@pytest.mark.asyncio
+async def test_quorum_deletion_keeps_hosts_of_its_call(fake_client, hosts):
+    service = FakeGroupService(latency=lambda: 0.05)
+
+    async with fake_client(service) as client:
+        # the deletion waits for the creation of the group, while the membership changes
+        creation = asyncio.create_task(client.create_group('test_group'))
+        await asyncio.sleep(0.01)
+        deletion = asyncio.create_task(client.delete_group('test_group', quorum=2))
+        await asyncio.sleep(0)
+
+        await client.update_hosts([NEW_HOST])
+
+        assert await creation is True
+        assert await deletion == []
+
+    assert all('test_group' not in service.groups[host] for host in hosts)
+    assert 'test_group' not in service.groups.get(NEW_HOST, set())
+
+
+class KeepAliveServer:
+    """
+    Minimal HTTP/1.1 server answering every request with 200 over kept-alive connections.
+    """
+
+    def __init__(self):
+        self.closed_connections = 0
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                lines = head.lower().split(b'\r\n')
+                length = next((int(line.split(b':')[1]) for line in lines if line.startswith(b'content-length')), 0)
+                await reader.readexactly(length)
+                writer.write(b'HTTP/1.1 200 OK\r\ncontent-length: 2\r\n\r\n{}')
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            self.closed_connections += 1
+        writer.close()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_idle_connections_to_removed_host_are_closed():
+    servers = [KeepAliveServer(), KeepAliveServer()]
+    hosts = [await server.start() for server in servers]
+
+    try:
+        async with SagaClient(hosts=hosts) as client:
+            assert await client.verify_group('test_group') == []
+
+            await client.update_hosts(hosts[:1])
+            await asyncio.gather(*client._background_tasks)
+            await asyncio.sleep(0.05)
+
+            assert servers[1].closed_connections == 1
+            assert servers[0].closed_connections == 0
+            open_connections = [c for c in client._client._transport._pool.connections if not c.is_closed()]
+            assert len(open_connections) == 1
+    finally:
+        for server in servers:
+            await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_closing_idle_connections_tolerates_changed_internals():
+    server = KeepAliveServer()
+    host = await server.start()
+
+    try:
+        async with SagaClient(hosts=[host, NEW_HOST]) as client:
+            assert await client.verify_group_on_host(client._client, host, 'test_group') is True
+
+            with mock.patch.object(httpcore.AsyncConnectionPool, 'connections', new_callable=mock.PropertyMock,
+                                   side_effect=AttributeError('connections')):
+                await client.update_hosts([NEW_HOST])
+                await asyncio.gather(*client._background_tasks)
+
+            assert host not in client._collection_urls
+    finally:
+        await server.stop()
+
+
+def test_host_provider_requires_watch():
+    with pytest.raises(TypeError):
+        HostProvider()
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from saga_client.saga import Saga, SagaStep
+
+
+def recorder(log, name, fail=False, delay=0):
+    async def run(results):
+        await asyncio.sleep(delay)
+        log.append(name)
+        if fail:
+            raise RuntimeError(f'{name} failed')
+        return name
+    return run
+
+
+@pytest.mark.asyncio
+async def test_independent_steps_run_concurrently():
+    running = 0
+    peak = 0
+
+    async def step(results):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    saga = Saga([SagaStep('a', step), SagaStep('b', step), SagaStep('c', step, depends_on=['a', 'b'])])
+    result = await saga.run()
+
+    assert result.success
+    assert peak == 2
+    assert set(result.results) == {'a', 'b', 'c'}
+
+
+@pytest.mark.asyncio
+async def test_dependency_results_are_visible():
+    async def group(results):
+        return 'g1'
+
+    async def members(results):
+        return f"members of {results['group']}"
+
+    result = await Saga([SagaStep('group', group), SagaStep('members', members, depends_on=['group'])]).run()
+
+    assert result.results['members'] == 'members of g1'
+
+
+@pytest.mark.asyncio
+async def test_failure_compensates_in_reverse_topological_order():
+    actions = []
+    compensations = []
+
+    saga = Saga([
+        SagaStep('group', recorder(actions, 'group'), recorder(compensations, 'group')),
+        SagaStep('members', recorder(actions, 'members'), recorder(compensations, 'members'), depends_on=['group']),
+        SagaStep('acl', recorder(actions, 'acl'), recorder(compensations, 'acl'), depends_on=['group']),
+        SagaStep('notify', recorder(actions, 'notify', fail=True), depends_on=['members', 'acl']),
+    ])
+    result = await saga.run()
+
+    assert not result.success
+    assert result.failed_step == 'notify'
+    assert compensations[-1] == 'group'
+    assert sorted(compensations[:2]) == ['acl', 'members']
+    assert sorted(result.compensated) == ['acl', 'group', 'members']
+    assert result.uncompensated == []
+
+
+@pytest.mark.asyncio
+async def test_running_steps_cancelled_and_compensated():
+    compensations = []
+
+    saga = Saga([
+        SagaStep('slow', recorder([], 'slow', delay=1), recorder(compensations, 'slow')),
+        SagaStep('fails', recorder([], 'fails', fail=True), recorder(compensations, 'fails')),
+        SagaStep('never', recorder([], 'never'), recorder(compensations, 'never'), depends_on=['fails']),
+    ])
+    result = await saga.run()
+
+    assert result.failed_step == 'fails'
+    assert compensations == ['slow']
+
+
+@pytest.mark.asyncio
+async def test_failed_compensation_reported():
+    saga = Saga([
+        SagaStep('a', recorder([], 'a'), recorder([], 'undo a', fail=True)),
+        SagaStep('b', recorder([], 'b', fail=True), depends_on=['a']),
+    ])
+    result = await saga.run()
+
+    assert result.uncompensated == ['a']
+
+
+def test_invalid_graphs_rejected():
+    async def step(results):
+        pass
+
+    with pytest.raises(ValueError):
+        Saga([SagaStep('a', step, depends_on=['missing'])])
+    with pytest.raises(ValueError):
+        Saga([SagaStep('a', step, depends_on=['b']), SagaStep('b', step, depends_on=['a'])])
+    with pytest.raises(ValueError):
+        Saga([SagaStep('a', step), SagaStep('a', step)])
+
+
+@pytest.mark.asyncio
+async def test_invalid_concurrency_rejected():
+    saga = Saga([SagaStep('a', recorder([], 'a'))])
+
+    with pytest.raises(ValueError, match='max_in_flight must be a positive integer'):
+        await saga.run(max_in_flight=0)
+    with pytest.raises(ValueError, match='compensation_concurrency must be a positive integer'):
+        await saga.run(compensation_concurrency=0)
@@ -0,0 +1,78 @@
+import threading
+from collections import Counter
+
+import pytest
+
+from benchmarks.fake_service import FakeGroupService
+from saga_client.client import SagaClient
+from saga_client.exceptions import GroupOperationException
+from saga_client.sharding import ShardedExecutor, shard_for
+
+
+def build_fake_client(**kwargs):
+    return SagaClient(transport=FakeGroupService().transport(), **kwargs)
+
+
+def failing_client(**kwargs):
+    raise RuntimeError('no hosts')
+
+
+def test_shard_for_is_stable_and_in_range():
+    assert shard_for('group-1', 4) == shard_for('group-1', 4)
+    assert {shard_for(f'group-{i}', 4) for i in range(100)} == {0, 1, 2, 3}
+
+
+def test_run_aggregates_results_and_metrics_of_all_workers(hosts):
+    executor = ShardedExecutor(
+        workers=2, concurrency=5, client_factory=build_fake_client, client_kwargs={'hosts': hosts}
+    )
+    operations = [('create', f'g{i}') for i in range(20)] + [('delete', f'g{i}') for i in range(20)]
+
+    results = list(executor.run(operations))
+
+    assert len(results) == 40
+    assert all(result['success'] for result in results)
+    assert Counter(result['operation'] for result in results) == {'create': 20, 'delete': 20}
+    assert executor.metrics.sagas[('create_group', 'success')] == 20
+    assert executor.metrics.sagas[('delete_group', 'success')] == 20
+    assert 'saga_total{operation="create_group",outcome="success"} 20' in executor.metrics.prometheus()
+
+
+def test_operations_on_the_same_group_stay_ordered(hosts):
+    executor = ShardedExecutor(
+        workers=3, concurrency=10, client_factory=build_fake_client, client_kwargs={'hosts': hosts}
+    )
+    operations = [('create', 'g1'), ('delete', 'g1'), ('verify', 'g1'), ('rename', 'g2')]
+
+    results = {result['operation']: result for result in executor.run(operations)}
+
+    assert results['create']['success'] is True
+    assert results['delete']['success'] is True
+    assert results['verify']['failed_hosts'] == hosts
+    assert results['rename']['error'] == 'unknown operation rename'
+
+
+def test_worker_failure_raises(hosts):
+    executor = ShardedExecutor(workers=1, client_factory=failing_client, client_kwargs={'hosts': hosts})
+
+    with pytest.raises(GroupOperationException, match='no hosts'):
+        list(executor.run([('create', 'g1')]))
+
+
+def test_first_result_arrives_before_operations_end(hosts):
+    executor = ShardedExecutor(workers=2, client_factory=build_fake_client, client_kwargs={'hosts': hosts})
+    first_result = threading.Event()
+    exhausted = threading.Event()
+
+    def operations():
+        yield 'create', 'g1'
+        first_result.wait(timeout=10)
+        yield 'create', 'g2'
+        exhausted.set()
+
+    results = executor.run(operations())
+
+    assert next(results)['group_id'] == 'g1'
+    assert not exhausted.is_set()
+    first_result.set()
+    assert [result['group_id'] for result in results] == ['g2']
@@ -0,0 +1,55 @@
+import asyncio
+import concurrent.futures
+
+import pytest
+
+from saga_client.client import SagaClient
+from saga_client.sync import SyncSagaClient
+
+
+def test_blocking_calls_share_one_loop_and_pool(service, hosts):
+    with SyncSagaClient(hosts=hosts, transport=service.transport()) as client:
+        assert client.create_group('test_group') is True
+        pool = client._client._client
+        assert client.verify_group('test_group') == []
+        assert client.delete_group('test_group') == []
+        assert client._client._client is pool
+
+    assert all(not service.groups[host] for host in hosts)
+    assert not client._thread.is_alive()
+
+
+def test_concurrent_callers_from_many_threads(service, hosts):
+    with SyncSagaClient(hosts=hosts, transport=service.transport()) as client:
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(client.create_group, [f'g{i}' for i in range(50)]))
+
+        futures = [client.submit(SagaClient.delete_group, f'g{i}') for i in range(50)]
+        assert [future.result() for future in concurrent.futures.as_completed(futures)] == [[]] * 50
+
+    assert results == [True] * 50
+    assert not client._thread.is_alive()
+
+
+def test_closed_client_rejects_calls(service, hosts):
+    client = SyncSagaClient(hosts=hosts, transport=service.transport())
+    client.close()
+    client.close()
+
+    with pytest.raises(RuntimeError):
+        client.create_group('test_group')
+
+
+def test_close_cancels_running_operations(service, hosts):
+    client = SyncSagaClient(hosts=hosts, transport=service.transport())
+
+    async def wait_forever(_client):
+        await asyncio.Event().wait()
+
+    future = client.submit(wait_forever)
+    client.close(timeout=1)
+
+    with pytest.raises(concurrent.futures.CancelledError):
+        future.result(timeout=1)
+    with pytest.raises(RuntimeError):
+        client.submit(wait_forever)